@@ -0,0 +1,94 @@
+try:
+	import numpy as np
+except ImportError:  # NumPy es opcional: solo lo necesita el emparejamiento por lotes
+	np = None
+
+from compiled_dfa import CompiledDFA, compile_dfa
+
+# Clase BatchMatcher: evalúa un mismo DFA sobre muchas cadenas a la vez con NumPy.
+# Las cadenas se ordenan por longitud y en cada paso t se avanzan, con una sola operación de
+# indexado sobre la tabla de transiciones, todas las cadenas que todavía tienen un carácter t.
+class BatchMatcher:
+	def __init__(self, dfa):
+		if np is None:
+			raise ImportError("El emparejamiento por lotes requiere NumPy (pip install numpy).")
+
+		compiled = dfa if isinstance(dfa, CompiledDFA) else compile_dfa(dfa)
+		num_states = compiled.num_states
+		num_classes = compiled.num_classes
+
+		# Estado muerto adicional (num_states) y clase adicional (num_classes) para símbolos desconocidos
+		self.dead = num_states
+		self.unknown_class = num_classes
+		table = np.full((num_states + 1, num_classes + 1), self.dead, dtype=np.int32)
+		rows = np.asarray(compiled.table, dtype=np.int64).reshape(num_states, num_classes)
+		defined = rows >= 0
+		table[:num_states, :num_classes][defined] = rows[defined] // num_classes
+		self.table = table
+
+		self.accept = np.zeros(num_states + 1, dtype=bool)
+		for state in range(num_states):
+			self.accept[state] = compiled.is_accept(state)
+		self.initial = compiled.initial // num_classes if compiled.initial >= 0 else self.dead
+
+		# Intervalos de puntos de código ordenados, para clasificar la entrada con searchsorted
+		intervals = compiled.all_intervals()
+		self.interval_starts = np.array([start for start, _, _ in intervals], dtype=np.int64)
+		self.interval_ends = np.array([end for _, end, _ in intervals], dtype=np.int64)
+		self.interval_classes = np.array([symbol_class for _, _, symbol_class in intervals], dtype=np.int32)
+
+	# Convierte un arreglo de puntos de código en índices de clase de equivalencia.
+	def classify(self, codes):
+		codes = np.asarray(codes, dtype=np.int64)
+		classes = np.full(codes.shape, self.unknown_class, dtype=np.int32)
+		if len(self.interval_starts) == 0:
+			return classes
+		index = np.searchsorted(self.interval_starts, codes, side='right') - 1
+		inside = index >= 0
+		inside[inside] = codes[inside] <= self.interval_ends[index[inside]]
+		classes[inside] = self.interval_classes[index[inside]]
+		return classes
+
+	# Evalúa una lista de cadenas (o bytes). Retorna un arreglo booleano con un resultado por cadena.
+	def match_many(self, strings):
+		strings = list(strings)
+		lengths = np.fromiter((len(string) for string in strings), dtype=np.int64, count=len(strings))
+		offsets = np.zeros(len(strings) + 1, dtype=np.int64)
+		np.cumsum(lengths, out=offsets[1:])
+
+		if strings and isinstance(strings[0], (bytes, bytearray)):
+			codes = np.frombuffer(b''.join(strings), dtype=np.uint8)
+		else:
+			codes = np.frombuffer(''.join(strings).encode('utf-32-le'), dtype=np.uint32)
+		return self.match_buffer(codes, offsets)
+
+	# Evalúa cadenas empaquetadas en un único búfer de puntos de código (o bytes) junto con sus
+	# desplazamientos: la cadena i ocupa codes[offsets[i]:offsets[i + 1]].
+	def match_buffer(self, codes, offsets):
+		offsets = np.asarray(offsets, dtype=np.int64)
+		classes = self.classify(codes)
+		starts = offsets[:-1]
+		lengths = offsets[1:] - starts
+
+		# Ordena por longitud descendente: en el paso t las cadenas activas forman un prefijo
+		order = np.argsort(-lengths, kind='stable')
+		sorted_starts = starts[order]
+		sorted_lengths = lengths[order]
+		states = np.full(len(order), self.initial, dtype=np.int32)
+
+		max_length = int(sorted_lengths[0]) if len(order) else 0
+		negated_lengths = -sorted_lengths
+		for t in range(max_length):
+			# Cantidad de cadenas con más de t caracteres
+			active = int(np.searchsorted(negated_lengths, -t, side='left'))
+			symbol_classes = classes[sorted_starts[:active] + t]
+			states[:active] = self.table[states[:active], symbol_classes]
+
+		result = np.empty(len(order), dtype=bool)
+		result[order] = self.accept[states]
+		return result
+
+
+# Evalúa un DFA sobre muchas cadenas y retorna un arreglo booleano.
+def match_batch(dfa, strings):
+	return BatchMatcher(dfa).match_many(strings)
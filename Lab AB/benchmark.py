@@ -0,0 +1,199 @@
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+from regex_parser import ShuntingYard, RegexParser
+from char_class import CharClass
+from syntax_tree import SyntaxTree, Node
+from nfa import Thompson, match
+from dfa import dfa_from_nfa, minimize_dfa, simulate_dfa
+from bitset_dfa import dfa_from_nfa_bitset
+from direct_dfa import DirectDFA
+from derivatives import DerivativeDFA
+
+# Suite de rendimiento: mide cada etapa de construcción y cada motor de emparejamiento sobre los
+# patrones de regex.txt y sobre casos patológicos generados. Por cada patrón reporta tiempo,
+# memoria pico (tracemalloc) y cantidad de estados, y guarda los resultados en JSON para comparar
+# ejecuciones.
+#
+# Uso: python benchmark.py [--rules regex.txt] [--output resultados.json] [--compare anterior.json]
+
+
+# Casos patológicos generados según la escala: '+' anidados, (a|b)*a(a|b){n} (DFA exponencial),
+# alternaciones largas y anidamiento profundo de paréntesis.
+def pathological_patterns(scale):
+	patterns = []
+	for depth in (4 * scale, 16 * scale):
+		patterns.append(('nested_plus', '(' * depth + 'a' + '+)' * depth))
+	for n in (4, 4 + 2 * scale):
+		patterns.append(('nth_from_end', f'(a|b)*a(a|b){{{n}}}'))
+	words = [format(i, 'b') for i in range(32 * scale)]
+	patterns.append(('long_alternation', '|'.join(words)))
+	depth = 200 * scale
+	patterns.append(('deep_nesting', '(' * depth + 'a|b' + ')' * depth))
+	return patterns
+
+
+def read_rules(path):
+	with open(path, encoding='utf-8') as file:
+		return [line.strip() for line in file if line.strip()]
+
+
+# Caracteres de las hojas del árbol sintáctico, usados para generar entradas de prueba. De cada
+# clase de caracteres se toman los extremos de sus intervalos.
+def pattern_alphabet(infix):
+	try:
+		root = RegexParser().parse(infix)
+	except ValueError:
+		return ['a']
+	alphabet = set()
+	stack = [root]
+	while stack:
+		node = stack.pop()
+		if node.children:
+			stack.extend(node.children)
+		elif isinstance(node.value, CharClass):
+			for start, end in node.value.intervals:
+				alphabet.update((chr(start), chr(end)))
+		elif node.value != 'ε':
+			alphabet.add(node.value)
+	return sorted(alphabet) or ['a']
+
+
+def measure(function, repeat, memory):
+	best = None
+	for _ in range(repeat):
+		start = time.perf_counter()
+		result = function()
+		elapsed = time.perf_counter() - start
+		best = elapsed if best is None else min(best, elapsed)
+	phase = {'time': best}
+	if memory:
+		tracemalloc.start()
+		function()
+		phase['peak_memory'] = tracemalloc.get_traced_memory()[1]
+		tracemalloc.stop()
+	return result, phase
+
+
+# Ejecuta todas las etapas para un patrón y retorna su registro de resultados.
+def benchmark_pattern(infix, kind, inputs, repeat, memory):
+	shunting_yard = ShuntingYard()
+	record = {'pattern': infix, 'kind': kind, 'phases': {}, 'states': {}}
+	phases = record['phases']
+
+	(success, postfix), phases['infix_to_postfix'] = measure(lambda: shunting_yard.infix_to_postfix(infix), repeat, memory)
+	if not success:
+		record['error'] = postfix
+		return record
+
+	_, phases['build_tree'] = measure(lambda: SyntaxTree().build_tree(postfix), repeat, memory)
+	nfa, phases['thompson'] = measure(lambda: Thompson(postfix), repeat, memory)
+	compact_nfa, phases['thompson_compact'] = measure(lambda: Thompson(postfix, compact=True), repeat, memory)
+	dfa, phases['dfa_from_nfa'] = measure(lambda: dfa_from_nfa(compact_nfa), repeat, memory)
+	_, phases['dfa_from_nfa_bitset'] = measure(lambda: dfa_from_nfa_bitset(compact_nfa), repeat, memory)
+	minimized, phases['minimize_dfa'] = measure(lambda: minimize_dfa(dfa), repeat, memory)
+
+	def build_direct():
+		root = Node('.')
+		root.children.extend((SyntaxTree().build_tree(postfix), Node('#')))
+		direct = DirectDFA(root)
+		direct.build()
+		return direct.dfa
+	direct_dfa, phases['direct_dfa_build'] = measure(build_direct, repeat, memory)
+
+	def build_derivative():
+		derivative = DerivativeDFA(SyntaxTree().build_tree(postfix))
+		return derivative.build()
+	derivative_dfa, phases['derivative_dfa_build'] = measure(build_derivative, repeat, memory)
+
+	_, phases['match_nfa'] = measure(lambda: [match(infix, string, shunting_yard, nfa) for string in inputs], repeat, False)
+	_, phases['simulate_dfa'] = measure(lambda: [simulate_dfa(minimized, string) for string in inputs], repeat, False)
+
+	record['states'] = {
+		'nfa': len(compact_nfa),
+		'dfa': len(dfa.states),
+		'minimized_dfa': len(minimized.states),
+		'direct_dfa': len(direct_dfa.states),
+		'derivative_dfa': len(derivative_dfa.states),
+	}
+	return record
+
+
+# Compara dos ejecuciones y retorna las regresiones (etapas más lentas que 'threshold' veces).
+def compare(previous, current, threshold):
+	previous_records = {(record['kind'], record['pattern']): record for record in previous['results']}
+	regressions = []
+	for record in current['results']:
+		old = previous_records.get((record['kind'], record['pattern']))
+		if old is None:
+			continue
+		for phase, values in record['phases'].items():
+			old_values = old['phases'].get(phase)
+			if old_values and old_values['time'] > 0 and values['time'] / old_values['time'] > threshold:
+				regressions.append((record['pattern'], phase, old_values['time'], values['time']))
+	return regressions
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description="Mide el rendimiento de la construcción y simulación de autómatas.")
+	parser.add_argument('--rules', default='regex.txt', help="archivo con una expresión regular por línea")
+	parser.add_argument('--output', help="archivo JSON donde guardar los resultados")
+	parser.add_argument('--compare', help="archivo JSON de una ejecución anterior para detectar regresiones")
+	parser.add_argument('--threshold', type=float, default=1.25, help="factor de lentitud que se considera regresión")
+	parser.add_argument('--repeat', type=int, default=3, help="repeticiones por etapa (se reporta el mejor tiempo)")
+	parser.add_argument('--scale', type=int, default=1, help="tamaño de los casos patológicos")
+	parser.add_argument('--inputs', type=int, default=100, help="cantidad de cadenas de prueba por patrón")
+	parser.add_argument('--input-length', type=int, default=200, help="longitud de las cadenas de prueba")
+	parser.add_argument('--no-memory', action='store_true', help="no medir la memoria pico")
+	parser.add_argument('--no-pathological', action='store_true', help="omitir los casos patológicos")
+	args = parser.parse_args(argv)
+
+	patterns = [('rule', infix) for infix in read_rules(args.rules)]
+	if not args.no_pathological:
+		patterns.extend(pathological_patterns(args.scale))
+
+	generator = random.Random(0)  # Entradas reproducibles entre ejecuciones
+	results = []
+	for kind, infix in patterns:
+		alphabet = pattern_alphabet(infix)
+		inputs = [''.join(generator.choice(alphabet) for _ in range(args.input_length)) for _ in range(args.inputs)]
+		record = benchmark_pattern(infix, kind, inputs, args.repeat, not args.no_memory)
+		results.append(record)
+
+		label = infix if len(infix) <= 40 else infix[:37] + '...'
+		total = sum(phase['time'] for phase in record['phases'].values())
+		print(f"{kind:<17} {label:<40} {total * 1000:9.2f} ms  estados {record['states']}")
+
+	report = {
+		'meta': {
+			'python': sys.version.split()[0],
+			'platform': platform.platform(),
+			'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+			'repeat': args.repeat,
+			'scale': args.scale,
+			'inputs': args.inputs,
+			'input_length': args.input_length,
+		},
+		'results': results,
+	}
+	if args.output:
+		with open(args.output, 'w', encoding='utf-8') as file:
+			json.dump(report, file, indent=2, ensure_ascii=False)
+
+	if args.compare:
+		with open(args.compare, encoding='utf-8') as file:
+			regressions = compare(json.load(file), report, args.threshold)
+		for infix, phase, old_time, new_time in regressions:
+			print(f"Regresión en {phase} de {infix!r}: {old_time * 1000:.2f} ms -> {new_time * 1000:.2f} ms")
+		if regressions:
+			return 1
+	return 0
+
+
+if __name__ == "__main__":
+	sys.exit(main())
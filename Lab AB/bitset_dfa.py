@@ -0,0 +1,104 @@
+from collections import deque
+
+from nfa import CompactNFA, to_compact
+from dfa import DFA, nfa_labels
+from char_class import partition_alphabet
+import instrumentation
+from instrumentation import timed
+
+# Construcción de subconjuntos sobre mapas de bits.
+#
+# Cada conjunto de estados del NFA es un entero de Python en el que el bit i indica si el estado i
+# pertenece al conjunto, por lo que unir cierres es un OR y usar el conjunto como clave es hashear
+# un entero. Se precalculan los símbolos atómicos que acepta cada estado etiquetado y el mapa de
+# bits de todos los estados etiquetados; el cierre epsilon (como mapa de bits) del destino de cada
+# estado etiquetado se calcula la primera vez que se necesita y se reutiliza después. Así, procesar
+# un subconjunto solo recorre sus estados etiquetados una vez y, por cada uno, une ese cierre al
+# destino de cada símbolo que acepta. Los subconjuntos pendientes se procesan en orden FIFO con
+# una deque.
+#
+# El resultado es el mismo DFA que produce dfa_from_nfa, salvo por los nombres de los estados.
+class BitsetDeterminizer:
+	def __init__(self, nfa):
+		self.nfa = nfa if isinstance(nfa, CompactNFA) else to_compact(nfa)
+		label, edge1 = self.nfa.label, self.nfa.edge1
+		num_states = len(self.nfa)
+		self.num_bytes = (num_states + 7) // 8
+
+		label_atoms = partition_alphabet(nfa_labels(self.nfa))
+		self.state_atoms = [None] * num_states  # Símbolos atómicos que acepta cada estado etiquetado
+		self.target_closures = [None] * num_states  # Cierre epsilon del destino de cada estado etiquetado
+		labelled = bytearray(self.num_bytes)
+		for state in range(num_states):
+			if label[state] is not None and edge1[state] >= 0:
+				self.state_atoms[state] = label_atoms[label[state]]
+				labelled[state >> 3] |= 1 << (state & 7)
+		self.labelled = int.from_bytes(labelled, 'little')
+
+	# Cierre epsilon de un estado como mapa de bits.
+	def closure(self, start):
+		label, edge1, edge2 = self.nfa.label, self.nfa.edge1, self.nfa.edge2
+		bits = bytearray(self.num_bytes)
+		bits[start >> 3] |= 1 << (start & 7)
+		stack = [start]
+		while stack:
+			state = stack.pop()
+			if label[state] is not None:
+				continue
+			for next_state in (edge1[state], edge2[state]):
+				if next_state >= 0 and not bits[next_state >> 3] & (1 << (next_state & 7)):
+					bits[next_state >> 3] |= 1 << (next_state & 7)
+					stack.append(next_state)
+		closure = int.from_bytes(bits, 'little')
+		if instrumentation.collector is not None:
+			instrumentation.collector.observe('epsilon_closure.size', bin(closure).count('1'))
+		return closure
+
+	# Construye el DFA.
+	def determinize(self):
+		state_atoms, target_closures, labelled = self.state_atoms, self.target_closures, self.labelled
+		accept_bit = 1 << self.nfa.accept if self.nfa.accept >= 0 else 0
+
+		dfa = DFA()
+		initial = self.closure(self.nfa.initial)
+		dfa.set_initial_state('S0')
+		dfa.add_state('S0', is_accept=bool(initial & accept_bit))
+		names = {initial: 'S0'}
+		pending = deque([initial])
+
+		while pending:
+			subset = pending.popleft()
+			name = names[subset]
+
+			# Une los cierres destino de los estados etiquetados del subconjunto, por símbolo
+			targets = {}
+			members = subset & labelled
+			while members:
+				lowest = members & -members
+				state = lowest.bit_length() - 1
+				members ^= lowest
+				closure = target_closures[state]
+				if closure is None:
+					closure = target_closures[state] = self.closure(self.nfa.edge1[state])
+				for atom in state_atoms[state]:
+					targets[atom] = targets.get(atom, 0) | closure
+
+			for atom, target in targets.items():
+				target_name = names.get(target)
+				if target_name is None:
+					target_name = names[target] = f'S{len(names)}'
+					dfa.add_state(target_name, is_accept=bool(target & accept_bit))
+					pending.append(target)
+				dfa.add_transition(name, atom, target_name)
+
+		stats = instrumentation.collector
+		if stats is not None:
+			stats.count('subset.states', len(dfa.states))
+			stats.count('subset.transitions', sum(len(transitions) for transitions in dfa.transitions.values()))
+		return dfa
+
+
+# Convierte un NFA (de objetos State o CompactNFA) en DFA con la construcción sobre mapas de bits.
+@timed('subset_construction')
+def dfa_from_nfa_bitset(nfa):
+	return BitsetDeterminizer(nfa).determinize()
@@ -0,0 +1,188 @@
+from bisect import bisect_right
+
+MAX_CODE_POINT = 0x10FFFF
+
+# Clase CharClass: conjunto de caracteres representado como intervalos disjuntos de puntos de código.
+# Se usa como etiqueta de transición para clases como [a-z0-9], [^abc] o \d, de modo que una clase
+# ocupa una sola transición en lugar de una por carácter.
+class CharClass:
+	__slots__ = ('intervals', 'starts')
+
+	def __init__(self, intervals):
+		# Ordena y une los intervalos (inicio, fin) inclusivos que se solapan o son contiguos
+		merged = []
+		for start, end in sorted(intervals):
+			if start > end:
+				raise ValueError(f"Intervalo inválido: ({start}, {end}).")
+			if merged and start <= merged[-1][1] + 1:
+				if end > merged[-1][1]:
+					merged[-1] = (merged[-1][0], end)
+			else:
+				merged.append((start, end))
+		self.intervals = tuple(merged)
+		self.starts = [start for start, _ in merged]
+
+	# Crea la clase de un único carácter.
+	@classmethod
+	def single(cls, char):
+		return cls([(ord(char), ord(char))])
+
+	# Crea la clase del rango de caracteres first-last.
+	@classmethod
+	def range(cls, first, last):
+		return cls([(ord(first), ord(last))])
+
+	def __eq__(self, other):
+		return isinstance(other, CharClass) and self.intervals == other.intervals
+
+	def __hash__(self):
+		return hash(self.intervals)
+
+	# Un carácter pertenece a la clase si cae en alguno de sus intervalos; otra clase pertenece
+	# si todos sus intervalos están contenidos en esta.
+	def __contains__(self, item):
+		if isinstance(item, CharClass):
+			return all(self.contains_range(start, end) for start, end in item.intervals)
+		return self.contains_range(ord(item), ord(item))
+
+	def contains_range(self, start, end):
+		index = bisect_right(self.starts, start) - 1
+		return index >= 0 and end <= self.intervals[index][1]
+
+	# Retorna la clase complementaria (todos los caracteres que no están en esta).
+	def negate(self):
+		intervals = []
+		next_start = 0
+		for start, end in self.intervals:
+			if start > next_start:
+				intervals.append((next_start, start - 1))
+			next_start = end + 1
+		if next_start <= MAX_CODE_POINT:
+			intervals.append((next_start, MAX_CODE_POINT))
+		return CharClass(intervals)
+
+	# Retorna la unión de esta clase con otra.
+	def union(self, other):
+		return CharClass(self.intervals + other.intervals)
+
+	# Retorna un carácter cualquiera de la clase.
+	def representative(self):
+		return chr(self.intervals[0][0])
+
+	def __len__(self):
+		return sum(end - start + 1 for start, end in self.intervals)
+
+	def __str__(self):
+		parts = []
+		for start, end in self.intervals:
+			if start == end:
+				parts.append(escape_char(chr(start)))
+			else:
+				parts.append(f"{escape_char(chr(start))}-{escape_char(chr(end))}")
+		return f"[{''.join(parts)}]"
+
+	def __repr__(self):
+		return f"CharClass({str(self)})"
+
+
+# Escapa un carácter para mostrarlo dentro de una clase.
+def escape_char(char):
+	if char in '\\]-^[':
+		return '\\' + char
+	if not char.isprintable():
+		return f"\\u{ord(char):04x}"
+	return char
+
+
+# Clases predefinidas para los escapes \d, \w y \s (y sus negaciones \D, \W y \S).
+DIGIT = CharClass([(ord('0'), ord('9'))])
+WORD = CharClass([(ord('0'), ord('9')), (ord('A'), ord('Z')), (ord('_'), ord('_')), (ord('a'), ord('z'))])
+SPACE = CharClass([(ord(char), ord(char)) for char in ' \t\n\r\f\v'])
+ESCAPE_CLASSES = {
+	'd': DIGIT, 'D': DIGIT.negate(),
+	'w': WORD, 'W': WORD.negate(),
+	's': SPACE, 'S': SPACE.negate(),
+}
+
+# Escapes de caracteres de control.
+ESCAPE_CHARS = {'n': '\n', 't': '\t', 'r': '\r', 'f': '\f', 'v': '\v'}
+
+
+# Indica si una etiqueta de transición (carácter o CharClass) acepta el símbolo dado, que puede ser
+# un carácter de la entrada o un símbolo atómico del alfabeto (ver partition_alphabet).
+def label_matches(label, symbol):
+	return label == symbol or (label.__class__ is CharClass and symbol in label)
+
+
+# Retorna los intervalos (inicio, fin) que cubre una etiqueta.
+def label_intervals(label):
+	if isinstance(label, CharClass):
+		return label.intervals
+	return ((ord(label), ord(label)),)
+
+
+# Divide el alfabeto en símbolos atómicos disjuntos a partir de un conjunto de etiquetas.
+# Cada etiqueta queda como unión exacta de átomos; dos caracteres pertenecen al mismo átomo si
+# están cubiertos exactamente por las mismas etiquetas. Los átomos de un solo carácter se
+# representan como str y el resto como CharClass.
+# Retorna un diccionario {etiqueta: tupla de átomos que la forman}.
+def partition_alphabet(labels):
+	labels = set(labels)
+	# Caso común: solo caracteres simples, cada uno es su propio átomo
+	if all(isinstance(label, str) for label in labels):
+		return {label: (label,) for label in labels}
+
+	# Barrido sobre los límites de los intervalos, con la firma (etiquetas activas) de cada segmento
+	events = {}
+	for label in labels:
+		for start, end in label_intervals(label):
+			events.setdefault(start, []).append((1, label))
+			events.setdefault(end + 1, []).append((-1, label))
+
+	active = {}
+	segments_by_signature = {}
+	boundaries = sorted(events)
+	for index, point in enumerate(boundaries):
+		for delta, label in events[point]:
+			active[label] = active.get(label, 0) + delta
+			if active[label] == 0:
+				del active[label]
+		if active and index + 1 < len(boundaries):
+			signature = frozenset(active)
+			segments_by_signature.setdefault(signature, []).append((point, boundaries[index + 1] - 1))
+
+	atoms = {label: [] for label in labels}
+	for signature, segments in segments_by_signature.items():
+		if len(segments) == 1 and segments[0][0] == segments[0][1]:
+			atom = chr(segments[0][0])
+		else:
+			atom = CharClass(segments)
+		for label in signature:
+			atoms[label].append(atom)
+
+	return {label: tuple(label_atoms) for label, label_atoms in atoms.items()}
+
+
+# Índice para encontrar, dado un carácter, el símbolo del alfabeto (carácter o CharClass) que lo contiene.
+class SymbolIndex:
+	def __init__(self, symbols):
+		self.chars = set()
+		entries = []
+		for symbol in symbols:
+			if isinstance(symbol, CharClass):
+				for start, end in symbol.intervals:
+					entries.append((start, end, symbol))
+			else:
+				self.chars.add(symbol)
+		entries.sort(key=lambda entry: entry[0])
+		self.starts = [start for start, _, _ in entries]
+		self.entries = entries
+
+	# Retorna el símbolo que contiene al carácter, o None si ninguno lo contiene.
+	def resolve(self, char):
+		if char in self.chars:
+			return char
+		index = bisect_right(self.starts, ord(char)) - 1
+		if index >= 0 and ord(char) <= self.entries[index][1]:
+			return self.entries[index][2]
+		return None
@@ -0,0 +1,175 @@
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from pattern import compile as compile_pattern
+from serialization import dumps_dfa, loads_dfa
+from codegen import compile_matcher
+from multi_pattern import MultiPatternMatcher, StateLimitError
+
+# Modo no interactivo: compila todas las reglas de un archivo (en paralelo) y evalúa cada línea
+# de la entrada contra todas ellas, escribiendo los resultados en JSON o NDJSON.
+#
+# Uso: python cli.py regex.txt [--input datos.txt] [--format ndjson] [--workers 8] [--render carpeta]
+#      python main.py regex.txt ...   (main.py delega aquí cuando recibe argumentos)
+#
+# Con NDJSON la salida es una línea por regla ({"type": "rule", ...}) seguida de una línea por
+# registro de la entrada ({"type": "record", ...}); se escribe a medida que se procesa, así que
+# sirve para entradas de cualquier tamaño. Con JSON se escribe un único objeto al final.
+#
+# Cada registro se evalúa con la función generada a partir del DFA de cada regla, los mismos que
+# compiló el pool. Con --combined las reglas válidas se unen en un único DFA etiquetado
+# (MultiPatternMatcher) que recorre cada registro una sola vez; como ese DFA puede crecer de forma
+# exponencial con la cantidad de reglas, su construcción se corta en --max-states estados y en ese
+# caso se vuelve a la evaluación por regla.
+
+
+# Cantidad máxima de estados por defecto del DFA combinado de --combined
+DEFAULT_MAX_STATES = 5000
+
+
+# Compila una regla en un proceso de trabajo. Retorna un diccionario con el DFA minimizado
+# serializado (o el error), la cantidad de estados de cada etapa y el tiempo de compilación.
+def compile_rule(infix):
+	start = time.perf_counter()
+	try:
+		pattern = compile_pattern(infix)
+		minimized_dfa = pattern.minimized_dfa
+	except ValueError as e:
+		return {'pattern': infix, 'error': str(e)}
+	return {
+		'pattern': infix,
+		'dfa': dumps_dfa(minimized_dfa),
+		'states': {
+			'nfa': len(pattern.compact_nfa),
+			'dfa': len(pattern.dfa.states),
+			'minimized_dfa': len(minimized_dfa.states),
+		},
+		'compile_time': time.perf_counter() - start,
+	}
+
+
+# Compila todas las reglas, repartiéndolas en un pool de procesos si hay más de un proceso.
+def compile_rules(rules, workers):
+	if workers == 1 or len(rules) <= 1:
+		return [compile_rule(infix) for infix in rules]
+	with ProcessPoolExecutor(workers) as executor:
+		return list(executor.map(compile_rule, rules, chunksize=max(1, len(rules) // (workers * 4))))
+
+
+# Genera los PDF del árbol, el AFN y los AFD de cada regla válida en 'directory'/regla_<n>.
+def render_rules(rules, directory):
+	from visualization import tree_graph, nfa_graph, dfa_graph, render
+
+	for index, infix in enumerate(rules):
+		try:
+			pattern = compile_pattern(infix)
+		except ValueError:
+			continue
+		rule_directory = os.path.join(directory, f'regla_{index}')
+		render(tree_graph(pattern.tree), 'arbol_sintactico', rule_directory, view=False)
+		render(nfa_graph(pattern.compact_nfa), 'afn_visualizado', rule_directory, view=False)
+		render(dfa_graph(pattern.dfa), 'dfa_regular', rule_directory, view=False)
+		render(dfa_graph(pattern.minimized_dfa), 'dfa_minimizado', rule_directory, view=False)
+		render(dfa_graph(pattern.direct_dfa), 'dfa_directo', rule_directory, view=False)
+
+
+# Retorna una función que, dado un registro, da la lista ordenada de reglas (índices del archivo)
+# que coinciden con él. Por defecto usa la función generada del DFA de cada regla; con combined,
+# un único DFA combinado de todas las reglas válidas si no supera 'max_states' estados.
+def build_rule_matcher(rules, compiled_rules, valid_rules, combined=False, max_states=DEFAULT_MAX_STATES):
+	if not valid_rules:
+		return lambda record: []
+	if combined:
+		try:
+			multi_matcher = MultiPatternMatcher([rules[index] for index in valid_rules], max_states=max_states)
+		except StateLimitError as e:
+			print(f"{e} Se evalúa cada regla por separado.", file=sys.stderr)
+		else:
+			return lambda record: [valid_rules[i] for i in multi_matcher.matches(record)]
+
+	matchers = [compile_matcher(loads_dfa(compiled_rules[index]['dfa'])) for index in valid_rules]
+	return lambda record: [valid_rules[i] for i, matcher in enumerate(matchers) if matcher(record)]
+
+
+def read_rules(path):
+	with open(path, encoding='utf-8') as file:
+		return [line.strip() for line in file if line.strip()]
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description="Compila un archivo de reglas y evalúa una entrada contra todas ellas.")
+	parser.add_argument('rules', help="archivo con una expresión regular por línea")
+	parser.add_argument('--input', default='-', help="archivo con un registro por línea ('-' para stdin)")
+	parser.add_argument('--output', default='-', help="archivo de salida ('-' para stdout)")
+	parser.add_argument('--format', choices=('json', 'ndjson'), default='ndjson', help="formato de salida")
+	parser.add_argument('--workers', type=int, default=os.cpu_count(), help="procesos para compilar las reglas")
+	parser.add_argument('--compile-only', action='store_true', help="solo compilar las reglas, sin leer la entrada")
+	parser.add_argument('--render', metavar='CARPETA', help="generar los PDF de cada regla en esta carpeta")
+	parser.add_argument('--combined', action='store_true', help="evaluar todas las reglas con un único DFA combinado")
+	parser.add_argument('--max-states', type=int, default=DEFAULT_MAX_STATES, help="límite de estados del DFA combinado")
+	args = parser.parse_args(argv)
+
+	rules = read_rules(args.rules)
+	start = time.perf_counter()
+	compiled_rules = compile_rules(rules, max(1, args.workers or 1))
+	valid_rules = [index for index, rule in enumerate(compiled_rules) if 'error' not in rule]
+	if not args.compile_only:
+		matching_rules = build_rule_matcher(rules, compiled_rules, valid_rules, args.combined, args.max_states)
+	compile_time = time.perf_counter() - start
+
+	if args.render:
+		render_rules(rules, args.render)
+
+	rule_reports = []
+	for index, rule in enumerate(compiled_rules):
+		report = {'type': 'rule', 'rule': index, 'pattern': rule['pattern']}
+		if 'error' in rule:
+			report['error'] = rule['error']
+		else:
+			report['states'] = rule['states']
+			report['compile_time'] = rule['compile_time']
+		rule_reports.append(report)
+
+	output = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8')
+	try:
+		if args.format == 'ndjson':
+			for report in rule_reports:
+				output.write(json.dumps(report, ensure_ascii=False) + '\n')
+
+		records = []
+		match_time = 0.0
+		if not args.compile_only:
+			source = sys.stdin if args.input == '-' else open(args.input, encoding='utf-8', newline='')
+			try:
+				for line_number, line in enumerate(source, 1):
+					record = line.rstrip('\r\n')
+					start = time.perf_counter()
+					matched = matching_rules(record)
+					match_time += time.perf_counter() - start
+					result = {'type': 'record', 'line': line_number, 'matched_rules': matched}
+					if args.format == 'ndjson':
+						output.write(json.dumps(result) + '\n')
+					else:
+						records.append(result)
+			finally:
+				if source is not sys.stdin:
+					source.close()
+
+		if args.format == 'json':
+			summary = {'compile_time': compile_time, 'match_time': match_time}
+			json.dump({'rules': rule_reports, 'records': records, 'timings': summary}, output, ensure_ascii=False, indent=2)
+			output.write('\n')
+	finally:
+		if output is not sys.stdout:
+			output.close()
+
+	# Estado de salida distinto de cero si alguna regla no pudo compilarse
+	return 1 if len(valid_rules) < len(rules) else 0
+
+
+if __name__ == "__main__":
+	sys.exit(main())
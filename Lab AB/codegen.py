@@ -0,0 +1,179 @@
+import weakref
+
+from compiled_dfa import CompiledDFA, compile_dfa
+
+# Generación de código: convierte un DFA en el código fuente de una función de Python
+# especializada, match(s) -> bool, con los estados y transiciones del DFA incrustados.
+#
+# Estrategias:
+#   'branch'     cadena if/elif por estado; las transiciones son comparaciones directas del carácter
+#                con literales y rangos. Cada carácter recorre la cadena hasta su estado, así que solo
+#                conviene con pocos estados (a lo sumo BRANCH_MAX_STATES).
+#   'translate'  str.translate convierte la entrada completa en códigos de clase en una sola
+#                pasada en C; el ciclo solo indexa una tupla con filas ya multiplicadas.
+#                Requiere menos de 255 clases y un alfabeto con a lo sumo TRANSLATE_MAX_CHARS caracteres.
+#   'table'      ciclo sobre la tabla plana del DFA compilado con las constantes como variables
+#                globales de la función; el costo por carácter no depende de la cantidad de estados.
+#   'auto'       'translate' si es posible; si no, 'branch' para DFA pequeños y 'table' para el resto.
+
+# Máximo de caracteres del alfabeto que se enumeran en la tabla de str.translate
+TRANSLATE_MAX_CHARS = 1 << 16
+
+# Máximo de estados con el que 'auto' elige la cadena if/elif de 'branch'
+BRANCH_MAX_STATES = 8
+
+
+# Genera el código fuente de la función 'name' para el DFA con la estrategia indicada.
+# Retorna el código y el diccionario de constantes que necesita para ejecutarse.
+def generate_matcher_source(dfa, strategy='auto', name='match'):
+	compiled = dfa if isinstance(dfa, CompiledDFA) else compile_dfa(dfa)
+	intervals = compiled.all_intervals()
+	if strategy == 'auto':
+		if can_translate(compiled, intervals):
+			strategy = 'translate'
+		else:
+			strategy = 'branch' if compiled.num_states <= BRANCH_MAX_STATES else 'table'
+
+	if strategy == 'branch':
+		return generate_branch(compiled, intervals, name)
+	if strategy == 'table':
+		return generate_table(compiled, name)
+	if strategy == 'translate':
+		if not can_translate(compiled, intervals):
+			raise ValueError("La estrategia 'translate' no admite este DFA (demasiadas clases o caracteres).")
+		return generate_translate(compiled, intervals, name)
+	raise ValueError(f"Estrategia de generación desconocida: {strategy!r}.")
+
+
+def can_translate(compiled, intervals):
+	return compiled.num_classes < 255 and sum(end - start + 1 for start, end, _ in intervals) <= TRANSLATE_MAX_CHARS
+
+
+# Condición de Python que es verdadera cuando 'c' está en alguno de los intervalos.
+def interval_condition(intervals):
+	singles = ''.join(chr(start) for start, end in intervals if start == end)
+	terms = []
+	if len(singles) == 1:
+		terms.append(f"c == {singles!r}")
+	elif singles:
+		terms.append(f"c in {singles!r}")
+	for start, end in intervals:
+		if start != end:
+			terms.append(f"{chr(start)!r} <= c <= {chr(end)!r}")
+	return ' or '.join(terms)
+
+
+def generate_branch(compiled, intervals, name):
+	num_classes, table = compiled.num_classes, compiled.table
+	accepting = [state for state in range(compiled.num_states) if compiled.is_accept(state)]
+
+	lines = [f"def {name}(s):"]
+	if compiled.initial < 0:
+		lines.append("\treturn False")
+		return '\n'.join(lines) + '\n', {}
+
+	lines.append("\tstate = 0")
+	lines.append("\tfor c in s:")
+	for state in range(compiled.num_states):
+		lines.append(f"\t\t{'if' if state == 0 else 'elif'} state == {state}:")
+
+		# Agrupa los intervalos del alfabeto según el estado destino, uniendo los contiguos
+		by_target = {}
+		for start, end, symbol_class in intervals:
+			target = table[state * num_classes + symbol_class]
+			if target < 0:
+				continue
+			ranges = by_target.setdefault(target // num_classes, [])
+			if ranges and ranges[-1][1] + 1 == start:
+				ranges[-1] = (ranges[-1][0], end)
+			else:
+				ranges.append((start, end))
+
+		if not by_target:
+			lines.append("\t\t\treturn False")
+			continue
+		for i, (target, ranges) in enumerate(by_target.items()):
+			lines.append(f"\t\t\t{'if' if i == 0 else 'elif'} {interval_condition(ranges)}:")
+			lines.append(f"\t\t\t\tstate = {target}")
+		lines.append("\t\t\telse:")
+		lines.append("\t\t\t\treturn False")
+
+	# Un literal de conjunto en 'in' se compila como una constante frozenset
+	lines.append(f"\treturn state in {{{', '.join(map(str, accepting))}}}" if accepting else "\treturn False")
+	return '\n'.join(lines) + '\n', {}
+
+
+def generate_translate(compiled, intervals, name):
+	num_classes, num_states = compiled.num_classes, compiled.num_states
+	# Clase extra para caracteres fuera del alfabeto y estado muerto extra, con una fila que vuelve
+	# a sí misma: el ciclo no necesita verificar transiciones no definidas.
+	dead_class = num_classes
+	width = num_classes + 1
+	dead_row = num_states * width
+
+	translation = {code: dead_class for code in range(width)}
+	for start, end, symbol_class in intervals:
+		for code in range(start, end + 1):
+			translation[code] = symbol_class
+
+	rows = []
+	for state in range(num_states + 1):
+		for symbol_class in range(width):
+			target = compiled.table[state * num_classes + symbol_class] if state < num_states and symbol_class < num_classes else -1
+			rows.append(target // num_classes * width if target >= 0 else dead_row)
+
+	accept_rows = frozenset(state * width for state in range(num_states) if compiled.is_accept(state))
+	initial = 0 if compiled.initial >= 0 else dead_row
+
+	# Los caracteres sin traducir conservan su código, que siempre es mayor que dead_class
+	source = (
+		f"def {name}(s):\n"
+		f"\tcodes = s.translate(TRANSLATION)\n"
+		f"\tif codes and max(codes) > {chr(dead_class)!r}:\n"
+		f"\t\treturn False\n"
+		f"\trow = {initial}\n"
+		f"\tfor code in codes.encode('latin-1'):\n"
+		f"\t\trow = TABLE[row + code]\n"
+		f"\treturn row in ACCEPT_ROWS\n"
+	)
+	return source, {'TRANSLATION': translation, 'TABLE': tuple(rows), 'ACCEPT_ROWS': accept_rows}
+
+
+def generate_table(compiled, name):
+	num_classes = compiled.num_classes
+	accept_rows = frozenset(state * num_classes for state in range(compiled.num_states) if compiled.is_accept(state))
+	if compiled.initial < 0:
+		return f"def {name}(s):\n\treturn False\n", {}
+
+	source = (
+		f"def {name}(s):\n"
+		f"\trow = {compiled.initial}\n"
+		f"\tfor c in s:\n"
+		f"\t\tsymbol_class = CLASSES.get(c)\n"
+		f"\t\tif symbol_class is None:\n"
+		f"\t\t\tsymbol_class = CLASSIFY(c)\n"
+		f"\t\t\tif symbol_class is None:\n"
+		f"\t\t\t\treturn False\n"
+		f"\t\trow = TABLE[row + symbol_class]\n"
+		f"\t\tif row < 0:\n"
+		f"\t\t\treturn False\n"
+		f"\treturn row in ACCEPT_ROWS\n"
+	)
+	constants = {'CLASSES': compiled.symbol_classes, 'CLASSIFY': compiled.classify, 'TABLE': compiled.table, 'ACCEPT_ROWS': accept_rows}
+	return source, constants
+
+
+# Funciones ya generadas, asociadas a cada DFA mientras este siga vivo.
+matcher_cache = weakref.WeakKeyDictionary()
+
+# Retorna una función f(s) -> bool especializada para el DFA, generándola la primera vez.
+def compile_matcher(dfa, strategy='auto'):
+	matchers = matcher_cache.get(dfa)
+	if matchers is None:
+		matchers = matcher_cache[dfa] = {}
+	if strategy not in matchers:
+		source, constants = generate_matcher_source(dfa, strategy)
+		namespace = dict(constants)
+		exec(compile(source, '<dfa codegen>', 'exec'), namespace)
+		matchers[strategy] = namespace['match']
+	return matchers[strategy]
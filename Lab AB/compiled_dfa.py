@@ -0,0 +1,149 @@
+from array import array
+from bisect import bisect_right
+
+from char_class import CharClass
+
+# Los caracteres de las clases con código menor a este límite se resuelven con el diccionario
+ASCII_LIMIT = 128
+
+# Clase que representa un DFA compilado a una tabla densa de transiciones.
+# Los estados se numeran como enteros, los símbolos con columnas idénticas se agrupan
+# en clases de equivalencia y los estados de aceptación se guardan en un mapa de bits.
+class CompiledDFA:
+	__slots__ = ('state_names', 'symbol_classes', 'class_intervals', 'interval_starts', 'num_classes', 'table', 'initial', 'accept_bits', '__weakref__')
+
+	def __init__(self, state_names, symbol_classes, class_intervals, num_classes, table, initial, accept_bits):
+		self.state_names = state_names  # Nombre original de cada estado, indexado por su número.
+		# Diccionario carácter -> índice de clase de equivalencia. Incluye de antemano los caracteres
+		# ASCII que caen en un intervalo de class_intervals; el resto se busca con classify(), y el
+		# diccionario no cambia durante el emparejamiento.
+		self.symbol_classes = symbol_classes
+		self.class_intervals = class_intervals  # Lista ordenada de (inicio, fin, clase) de las CharClass.
+		self.interval_starts = [start for start, _, _ in class_intervals]
+		for start, end, symbol_class in class_intervals:
+			for code in range(start, min(end, ASCII_LIMIT - 1) + 1):
+				symbol_classes.setdefault(chr(code), symbol_class)
+		self.num_classes = num_classes  # Cantidad de clases de equivalencia (columnas de la tabla).
+		# Tabla plana de tamaño estados * clases. Cada celda guarda el desplazamiento de la fila
+		# del estado destino (estado * num_classes), o -1 si la transición no está definida.
+		self.table = table
+		self.initial = initial  # Desplazamiento de la fila del estado inicial (-1 si no hay).
+		self.accept_bits = accept_bits  # Entero usado como mapa de bits: bit i = estado i acepta.
+
+	@property
+	def num_states(self):
+		return len(self.state_names)
+
+	# Retorna True si el estado (dado por su número) es de aceptación.
+	def is_accept(self, state):
+		return (self.accept_bits >> state) & 1 == 1
+
+	# Retorna la clase de equivalencia de un carácter que no está en symbol_classes, buscándolo en
+	# los intervalos de las clases de caracteres, o None si el DFA no tiene transiciones con él.
+	def classify(self, char):
+		index = bisect_right(self.interval_starts, ord(char)) - 1
+		if index < 0 or ord(char) > self.class_intervals[index][1]:
+			return None
+		return self.class_intervals[index][2]
+
+	# Retorna todos los intervalos (inicio, fin, clase) del alfabeto, incluidos los caracteres simples.
+	def all_intervals(self):
+		intervals = list(self.class_intervals)
+		for char, symbol_class in self.symbol_classes.items():
+			# Omite los caracteres ASCII agregados por pertenecer a un intervalo
+			index = bisect_right(self.interval_starts, ord(char)) - 1
+			if index < 0 or ord(char) > self.class_intervals[index][1]:
+				intervals.append((ord(char), ord(char), symbol_class))
+		return sorted(intervals)
+
+	# Retorna el número del estado alcanzado tras consumir la cadena, o -1 si se llega a una
+	# transición no definida.
+	def final_state(self, input_string):
+		classes = self.symbol_classes
+		table = self.table
+		row = self.initial
+		if row < 0:
+			return -1
+
+		for symbol in input_string:
+			symbol_class = classes.get(symbol)
+			if symbol_class is None:
+				symbol_class = self.classify(symbol)
+				if symbol_class is None:
+					return -1
+			row = table[row + symbol_class]
+			if row < 0:
+				return -1
+
+		return row // self.num_classes
+
+	# Simula el DFA compilado sobre la cadena de entrada.
+	def match(self, input_string):
+		classes = self.symbol_classes
+		table = self.table
+		row = self.initial
+		if row < 0:
+			return False
+
+		for symbol in input_string:
+			symbol_class = classes.get(symbol)
+			if symbol_class is None:
+				symbol_class = self.classify(symbol)
+				if symbol_class is None:
+					return False
+			row = table[row + symbol_class]
+			# Transición no definida: la cadena ya no puede ser aceptada
+			if row < 0:
+				return False
+
+		return (self.accept_bits >> (row // self.num_classes)) & 1 == 1
+
+
+# Compila un DFA (de dfa_from_nfa, minimize_dfa o DirectDFA.dfa) a su forma tabular.
+def compile_dfa(dfa):
+	# Paso 1: numerar los estados, dejando el inicial siempre como el estado 0
+	state_names = list(dfa.states)
+	if dfa.initial_state in state_names:
+		state_names.remove(dfa.initial_state)
+		state_names.insert(0, dfa.initial_state)
+	state_index = {state: i for i, state in enumerate(state_names)}
+
+	# Paso 2: agrupar los símbolos cuya columna de destinos es idéntica en todos los estados
+	column_classes = {}  # Mapea una columna (tupla de destinos) a su índice de clase
+	symbol_classes = {}
+	class_intervals = []
+	for symbol in sorted(dfa.alphabet, key=str):
+		column = tuple(
+			state_index.get(dfa.transitions.get(state, {}).get(symbol), -1)
+			for state in state_names
+		)
+		if column not in column_classes:
+			column_classes[column] = len(column_classes)
+		if isinstance(symbol, CharClass):
+			class_intervals.extend((start, end, column_classes[column]) for start, end in symbol.intervals)
+		else:
+			symbol_classes[symbol] = column_classes[column]
+	class_intervals.sort()
+
+	# Paso 3: construir la tabla densa con desplazamientos de fila ya multiplicados
+	num_classes = max(len(column_classes), 1)
+	table = array('l', [-1]) * (len(state_names) * num_classes)
+	for column, symbol_class in column_classes.items():
+		for state, target in enumerate(column):
+			if target >= 0:
+				table[state * num_classes + symbol_class] = target * num_classes
+
+	# Paso 4: mapa de bits de estados de aceptación
+	accept_bits = 0
+	accept_states = set(dfa.accept_states)
+	for i, state in enumerate(state_names):
+		if state in accept_states:
+			accept_bits |= 1 << i
+
+	initial = 0 if state_names and dfa.initial_state in state_index else -1
+	return CompiledDFA(state_names, symbol_classes, class_intervals, num_classes, table, initial, accept_bits)
+
+
+def simulate_compiled_dfa(compiled_dfa, input_string):
+	# Equivalente a simulate_dfa, pero sobre la tabla compilada
+	return compiled_dfa.match(input_string)
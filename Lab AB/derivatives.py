@@ -0,0 +1,341 @@
+from collections import deque
+
+from dfa import DFA
+from syntax_tree import Repeat, Group
+from char_class import SymbolIndex, label_matches, partition_alphabet
+import instrumentation
+from instrumentation import timed
+
+# Construcción de DFA por derivadas de Brzozowski.
+#
+# La derivada de una expresión r respecto a un símbolo a es la expresión que reconoce las cadenas w
+# tales que aw pertenece a r. Cada estado del DFA es una expresión (término) y la transición con a
+# lleva a su derivada; un estado es de aceptación si su expresión acepta la cadena vacía.
+#
+# Para que el conjunto de derivadas sea finito y las equivalentes compartan estado, los términos se
+# construyen con constructores que normalizan (asociatividad, conmutatividad e idempotencia de '|',
+# y las reglas de ε y ∅: ε·r = r, ∅·r = ∅, r|∅ = r, ∅* = ε, ...) y se internan en una tabla, de
+# modo que dos términos iguales son el mismo objeto. Las concatenaciones son binarias y anidadas a
+# la derecha (a·(b·(c·d))): la derivada de una secuencia reutiliza su cola ya internada en lugar de
+# copiarla, y derivar un literal de n caracteres cuesta O(n) y no O(n²). No se construye ningún NFA, y las repeticiones
+# {m,n} se derivan directamente: la derivada de r{m,n} es d(r)·r{m-1,n-1}.
+
+# Tipos de término; los operadores usan los mismos caracteres que el árbol sintáctico
+EMPTY = '∅'  # No reconoce ninguna cadena
+EPSILON = 'ε'  # Reconoce solo la cadena vacía
+SYMBOL = 'symbol'  # Un carácter o clase de caracteres
+SEQUENCE = '.'  # Concatenación: args = (cabeza, cola); la cabeza nunca es una secuencia
+UNION = '|'  # Alternación de dos o más términos, ordenados por identificador
+STAR = '*'
+REPEAT = 'repeat'  # Repetición acotada: args = (término, min, max)
+
+
+# Clase Term: nodo inmutable e internado de una expresión. Guarda si acepta la cadena vacía y las
+# etiquetas con las que puede empezar, calculadas al construirlo a partir de las de sus hijos.
+class Term:
+	__slots__ = ('kind', 'args', 'id', 'nullable', 'first')
+
+	def __init__(self, kind, args, id, nullable, first):
+		self.kind = kind
+		self.args = args
+		self.id = id
+		self.nullable = nullable
+		self.first = first
+
+	def __repr__(self):
+		return f"Term({self.kind!r}, #{self.id})"
+
+
+# Clase TermTable: tabla de términos internados, constructores que normalizan y derivadas en caché.
+class TermTable:
+	def __init__(self):
+		self.terms = {}  # (tipo, args) -> Term
+		self.labels = set()  # Etiquetas de todos los símbolos creados
+		self.derivatives = {}  # (término, símbolo) -> derivada
+		self.empty = self.intern(EMPTY, (), False, frozenset())
+		self.epsilon = self.intern(EPSILON, (), True, frozenset())
+
+	def __len__(self):
+		return len(self.terms)
+
+	def intern(self, kind, args, nullable, first):
+		key = (kind, args)
+		term = self.terms.get(key)
+		if term is None:
+			term = self.terms[key] = Term(kind, args, len(self.terms), nullable, first)
+		return term
+
+	def symbol(self, label):
+		self.labels.add(label)
+		return self.intern(SYMBOL, (label,), False, frozenset((label,)))
+
+	# Concatenación: elimina ε, se anula con ∅ y anida a la derecha. Las secuencias que no son el
+	# último término se desarman en sus elementos; el último se usa como cola sin recorrerlo.
+	def sequence(self, terms):
+		terms = tuple(terms)
+		if not terms:
+			return self.epsilon
+		items = []
+		for term in terms[:-1]:
+			while term.kind == SEQUENCE:
+				items.append(term.args[0])
+				term = term.args[1]
+			if term is self.empty:
+				return self.empty
+			if term is not self.epsilon:
+				items.append(term)
+		tail = terms[-1]
+		if tail is self.empty:
+			return self.empty
+		if tail is self.epsilon:
+			if not items:
+				return self.epsilon
+			tail = items.pop()
+
+		for head in reversed(items):
+			first = head.first | tail.first if head.nullable else head.first
+			tail = self.intern(SEQUENCE, (head, tail), head.nullable and tail.nullable, first)
+		return tail
+
+	# Alternación: aplana, elimina ∅ y duplicados y ordena los términos. ε se descarta si otro
+	# término ya acepta la cadena vacía.
+	def union(self, terms):
+		items = {}
+		for term in terms:
+			for item in (term.args if term.kind == UNION else (term,)):
+				if item is not self.empty:
+					items[item.id] = item
+		nullable = any(item.nullable for item in items.values())
+		if self.epsilon.id in items and sum(item.nullable for item in items.values()) > 1:
+			del items[self.epsilon.id]
+		if not items:
+			return self.empty
+		if len(items) == 1:
+			return next(iter(items.values()))
+
+		ordered = tuple(items[id] for id in sorted(items))
+		return self.intern(UNION, ordered, nullable, frozenset().union(*(item.first for item in ordered)))
+
+	def star(self, term):
+		if term is self.empty or term is self.epsilon:
+			return self.epsilon
+		if term.kind == STAR:
+			return term
+		return self.intern(STAR, (term,), True, term.first)
+
+	# Repetición r{min,max}; max es None si no está acotada.
+	def repeat(self, term, min, max):
+		if max == 0 or term is self.epsilon:
+			return self.epsilon
+		if term is self.empty:
+			return self.epsilon if min == 0 else self.empty
+		if min == 0 and max is None:
+			return self.star(term)
+		if min == 1 and max == 1:
+			return term
+		return self.intern(REPEAT, (term, min, max), min == 0 or term.nullable, term.first)
+
+	# Convierte un árbol sintáctico en término con un recorrido post-orden iterativo.
+	# El parser arma las concatenaciones como cadenas de '.' anidadas a la izquierda; cada cadena se
+	# trata como un solo nodo con todos sus operandos, para construir la secuencia de una vez.
+	def from_tree(self, root):
+		if root is None:
+			return self.empty
+		terms = {}
+		operands = {}  # Nodo '.' -> operandos de su cadena de concatenaciones
+		stack = [(root, False)]
+		while stack:
+			node, children_done = stack.pop()
+			if not children_done and node.children:
+				children = node.children
+				if node.value == '.':
+					children = operands[node] = concatenation_operands(node)
+				stack.append((node, True))
+				for child in reversed(children):
+					stack.append((child, False))
+				continue
+
+			children = [terms.pop(child) for child in operands.pop(node, node.children)]
+			value = node.value
+			if isinstance(value, Repeat):
+				term = self.repeat(children[0], value.min, value.max)
+			elif isinstance(value, Group):
+				term = children[0]
+			elif value == '.' and children:
+				term = self.sequence(children)
+			elif value == '|' and children:
+				term = self.union(children)
+			elif value == '*' and children:
+				term = self.star(children[0])
+			elif value == '+' and children:
+				term = self.repeat(children[0], 1, None)
+			elif value == '?' and children:
+				term = self.union((children[0], self.epsilon))
+			elif value == 'ε':
+				term = self.epsilon
+			else:
+				term = self.symbol(value)
+			terms[node] = term
+		return terms[root]
+
+	# Retorna la derivada de 'term' respecto a 'symbol' (un carácter o un símbolo atómico del alfabeto).
+	# Las derivadas de los subtérminos se calculan antes con una pila, sin recursión, y todas quedan en caché.
+	def derivative(self, term, symbol):
+		derivatives = self.derivatives
+		result = derivatives.get((term, symbol))
+		if result is not None:
+			return result
+
+		stack = [term]
+		while stack:
+			current = stack[-1]
+			if (current, symbol) in derivatives:
+				stack.pop()
+				continue
+			pending = [child for child in self.derivative_children(current) if (child, symbol) not in derivatives]
+			if pending:
+				stack.extend(pending)
+				continue
+			stack.pop()
+			derivatives[(current, symbol)] = self.combine(current, symbol)
+		return derivatives[(term, symbol)]
+
+	# Subtérminos cuyas derivadas necesita combine().
+	def derivative_children(self, term):
+		kind = term.kind
+		if kind == SEQUENCE:
+			head = term.args[0]
+			return term.args if head.nullable else (head,)
+		if kind == UNION:
+			return term.args
+		if kind == STAR or kind == REPEAT:
+			return term.args[:1]
+		return ()
+
+	# Calcula la derivada de un término a partir de las derivadas (ya en caché) de sus subtérminos.
+	def combine(self, term, symbol):
+		derivatives = self.derivatives
+		kind = term.kind
+		if kind == SYMBOL:
+			return self.epsilon if label_matches(term.args[0], symbol) else self.empty
+		if kind == SEQUENCE:
+			# d(r·s) = d(r)·s | d(s) (si r es anulable); s es la cola ya internada
+			head, tail = term.args
+			derivative = self.sequence((derivatives[(head, symbol)], tail))
+			if head.nullable:
+				return self.union((derivative, derivatives[(tail, symbol)]))
+			return derivative
+		if kind == UNION:
+			return self.union([derivatives[(item, symbol)] for item in term.args])
+		if kind == STAR:
+			return self.sequence((derivatives[(term.args[0], symbol)], term))
+		if kind == REPEAT:
+			child, min, max = term.args
+			rest = self.repeat(child, min - 1 if min > 0 else 0, max - 1 if max is not None else None)
+			return self.sequence((derivatives[(child, symbol)], rest))
+		return self.empty
+
+	# Símbolos atómicos con los que un término puede tener una derivada distinta de ∅.
+	def term_atoms(self, term, label_atoms):
+		atoms = set()
+		for label in term.first:
+			atoms.update(label_atoms[label])
+		return atoms
+
+
+# Retorna los operandos de una cadena de concatenaciones '.' en orden, sin recursión.
+def concatenation_operands(node):
+	operands = []
+	stack = [node]
+	while stack:
+		current = stack.pop()
+		if current.value == '.' and current.children:
+			stack.extend(reversed(current.children))
+		else:
+			operands.append(current)
+	return operands
+
+
+# Clase DerivativeDFA para construir un DFA a partir del árbol sintáctico mediante derivadas.
+# A diferencia de DirectDFA, el árbol no necesita el símbolo de fin '#'.
+class DerivativeDFA:
+	def __init__(self, root):
+		self.root = root
+		self.table = TermTable()
+		self.dfa = DFA()
+		self.state_terms = {}  # Nombre de estado DFA -> término que representa
+
+	# Método principal para construir el DFA.
+	@timed('derivative_dfa')
+	def build(self):
+		table = self.table
+		initial = table.from_tree(self.root)
+		# Las etiquetas de los símbolos se dividen en símbolos atómicos disjuntos
+		label_atoms = partition_alphabet(table.labels)
+
+		names = {initial: 'S0'}
+		self.state_terms['S0'] = initial
+		self.dfa.set_initial_state('S0')
+		self.dfa.add_state('S0', is_accept=initial.nullable)
+		pending = deque([initial])
+
+		while pending:
+			term = pending.popleft()
+			name = names[term]
+			for atom in table.term_atoms(term, label_atoms):
+				target = table.derivative(term, atom)
+				# ∅ es el estado muerto, que no se agrega al DFA
+				if target is table.empty:
+					continue
+				target_name = names.get(target)
+				if target_name is None:
+					target_name = names[target] = f'S{len(names)}'
+					self.state_terms[target_name] = target
+					self.dfa.add_state(target_name, is_accept=target.nullable)
+					pending.append(target)
+				self.dfa.add_transition(name, atom, target_name)
+
+		stats = instrumentation.collector
+		if stats is not None:
+			stats.count('derivative.states', len(self.dfa.states))
+			stats.count('derivative.terms', len(table))
+		return self.dfa
+
+
+# Clase DerivativeMatcher: emparejamiento perezoso por derivadas.
+# Cada carácter de la entrada se resuelve a su símbolo atómico y el estado avanza a la derivada
+# respecto a ese símbolo, que se calcula solo la primera vez y luego se toma de la caché de la tabla.
+# Así solo se construyen los estados que la entrada realmente visita.
+class DerivativeMatcher:
+	def __init__(self, root):
+		self.table = TermTable()
+		self.initial = self.table.from_tree(root)
+		atoms = set()
+		for label_atoms in partition_alphabet(self.table.labels).values():
+			atoms.update(label_atoms)
+		self.symbol_index = SymbolIndex(atoms)
+
+	# Retorna True si la cadena completa coincide con la expresión.
+	def match(self, string):
+		table, resolve = self.table, self.symbol_index.resolve
+		derivatives, empty = table.derivatives, table.empty
+		term = self.initial
+
+		for char in string:
+			symbol = resolve(char)
+			# Un carácter que ninguna etiqueta contiene lleva al estado muerto
+			if symbol is None:
+				return False
+			target = derivatives.get((term, symbol))
+			if target is None:
+				target = table.derivative(term, symbol)
+			if target is empty:
+				return False
+			term = target
+
+		return term.nullable
+
+	# Cantidad de términos internados hasta ahora (estados visitados y sus subtérminos).
+	@property
+	def num_terms(self):
+		return len(self.table)
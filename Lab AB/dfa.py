@@ -1,5 +1,10 @@
 
-from graphviz import Digraph
+from collections import deque
+
+from nfa import CompactNFA
+from char_class import SymbolIndex, label_matches, partition_alphabet
+import instrumentation
+from instrumentation import timed
 
 # Clase DFA para representar un Autómata Finito Determinista.
 class DFA:
@@ -8,11 +13,14 @@ class DFA:
 		self.transitions = {}  # Diccionario para las transiciones; formato: {estado: {símbolo: estado_destino}}.
 		self.initial_state = None  # Almacena el estado inicial del DFA.
 		self.accept_states = []  # Lista que contiene los estados de aceptación del DFA.
-		self.alphabet = set()  # Conjunto de símbolos que el DFA puede procesar.
+		self.alphabet = set()  # Conjunto de símbolos que el DFA puede procesar (caracteres o CharClass).
+		self.symbol_index = None  # Índice carácter -> símbolo, construido al primer uso.
 
 	# Método para agregar un estado al DFA. 'is_accept' indica si es un estado de aceptación.
+	# 'transitions' tiene una entrada por estado, así que sirve de índice: buscar en la lista de
+	# estados haría cuadrática la construcción de DFA grandes.
 	def add_state(self, state, is_accept=False):
-		if state not in self.states:
+		if state not in self.transitions:
 			self.states.append(state)
 			self.transitions[state] = {}
 		if is_accept:
@@ -22,20 +30,49 @@ class DFA:
 	def add_transition(self, state_from, symbol, state_to):
 		if state_from in self.transitions:
 			self.transitions[state_from][symbol] = state_to
-			self.alphabet.add(symbol)
+			if symbol not in self.alphabet:
+				self.alphabet.add(symbol)
+				self.symbol_index = None
 
 	# Método para definir el estado inicial del DFA.
 	def set_initial_state(self, state):
 		self.initial_state = state
 
+	# Retorna el símbolo del alfabeto (carácter o clase de caracteres) que contiene al carácter dado,
+	# o None si ninguno lo contiene.
+	def resolve_symbol(self, char):
+		if char in self.alphabet:
+			return char
+		if self.symbol_index is None:
+			self.symbol_index = SymbolIndex(self.alphabet)
+		return self.symbol_index.resolve(char)
+
 # Función para calcular el cierre epsilon de un conjunto de estados.
 # El cierre epsilon de un estado incluye al estado mismo y todos los estados alcanzables solo a través de transiciones epsilon.
-def epsilon_closure(states):
+# Si se pasa un CompactNFA en 'nfa', los estados son índices dentro de sus arreglos.
+def epsilon_closure(states, nfa=None):
 	closure = set(states)  # Inicializa el cierre con los estados proporcionados.
 	stack = list(states)  # Utiliza una pila para explorar los estados.
 
+	if nfa is not None:
+		label, edge1, edge2 = nfa.label, nfa.edge1, nfa.edge2
+		while stack:
+			state = stack.pop()
+			if label[state] is not None:
+				continue
+			for next_state in (edge1[state], edge2[state]):
+				if next_state >= 0 and next_state not in closure:
+					closure.add(next_state)
+					stack.append(next_state)
+		if instrumentation.collector is not None:
+			instrumentation.collector.observe('epsilon_closure.size', len(closure))
+		return closure
+
 	while stack:
 		state = stack.pop()
+		# Solo las aristas de estados sin etiqueta son transiciones epsilon
+		if state.label is not None:
+			continue
 		if state.edge1 is not None and state.edge1 not in closure:
 			closure.add(state.edge1)
 			stack.append(state.edge1)
@@ -43,36 +80,74 @@ def epsilon_closure(states):
 			closure.add(state.edge2)
 			stack.append(state.edge2)
 
+	if instrumentation.collector is not None:
+		instrumentation.collector.observe('epsilon_closure.size', len(closure))
 	return closure
 
 # Función para obtener el conjunto de estados a los que se puede llegar desde 'states' con el símbolo 'symbol'.
-def move(states, symbol):
+def move(states, symbol, nfa=None):
 	result = set()
+	if nfa is not None:
+		for state in states:
+			label = nfa.label[state]
+			if label is not None and label_matches(label, symbol) and nfa.edge1[state] >= 0:
+				result.add(nfa.edge1[state])
+		return result
+
 	for state in states:
-		if state.label == symbol:
+		if state.label is not None and label_matches(state.label, symbol):
 			if state.edge1 is not None:
 				result.add(state.edge1)
 	return result
 
+# Retorna el conjunto de etiquetas (caracteres o CharClass) de las transiciones de un NFA.
+def nfa_labels(nfa):
+	if isinstance(nfa, CompactNFA):
+		return set(label for label in nfa.label if label is not None)
+
+	labels = set()
+	visited = {nfa.initial}
+	stack = [nfa.initial]
+	while stack:
+		state = stack.pop()
+		if state.label is not None:
+			labels.add(state.label)
+		for next_state in (state.edge1, state.edge2):
+			if next_state is not None and next_state not in visited:
+				visited.add(next_state)
+				stack.append(next_state)
+	return labels
+
 # Función para convertir un NFA a DFA utilizando el algoritmo de construcción de subconjuntos.
+# Acepta tanto un NFA de objetos State como un CompactNFA. Las etiquetas que son clases de
+# caracteres se dividen en símbolos atómicos disjuntos, así que cada transición del DFA cubre
+# un intervalo completo en lugar de un carácter.
+@timed('subset_construction')
 def dfa_from_nfa(nfa):
-	initial_closure = epsilon_closure({nfa.initial})  # Calcula el cierre epsilon del estado inicial.
+	compact = nfa if isinstance(nfa, CompactNFA) else None
+	label_atoms = partition_alphabet(nfa_labels(nfa))  # Átomos del alfabeto que forman cada etiqueta.
+	initial_closure = epsilon_closure({nfa.initial}, compact)  # Calcula el cierre epsilon del estado inicial.
 	dfa = DFA()  # Crea un nuevo DFA.
 	initial_state_name = 'S0'  # Nombre para el estado inicial del DFA.
 	dfa.set_initial_state(initial_state_name)  # Establece el estado inicial del DFA.
 	# Verifica si el estado inicial debe ser de aceptación.
 	dfa.add_state(initial_state_name, is_accept=nfa.accept in initial_closure)
 
-	# Lista de estados DFA pendientes de procesar.
-	unprocessed_states = [(initial_state_name, initial_closure)]
+	# Cola de estados DFA pendientes de procesar.
+	unprocessed_states = deque([(initial_state_name, initial_closure)])
 	# Mapeo de conjuntos de estados NFA a nombres de estados DFA para evitar duplicados.
 	dfa_state_mapping = {frozenset(initial_closure): initial_state_name}
 
 	while unprocessed_states:
-		dfa_state_name, nfa_states = unprocessed_states.pop(0)
-		for symbol in set(state.label for state in nfa_states if state.label):
-			target_nfa_states = move(nfa_states, symbol)
-			closure = epsilon_closure(target_nfa_states)
+		dfa_state_name, nfa_states = unprocessed_states.popleft()
+		symbols = set()
+		for state in nfa_states:
+			label = state.label if compact is None else compact.label[state]
+			if label is not None:
+				symbols.update(label_atoms[label])
+		for symbol in symbols:
+			target_nfa_states = move(nfa_states, symbol, compact)
+			closure = epsilon_closure(target_nfa_states, compact)
 			closure_frozenset = frozenset(closure)
 
 			if closure_frozenset not in dfa_state_mapping:
@@ -83,39 +158,28 @@ def dfa_from_nfa(nfa):
 
 			dfa.add_transition(dfa_state_name, symbol, dfa_state_mapping[closure_frozenset])
 
+	stats = instrumentation.collector
+	if stats is not None:
+		stats.count('subset.states', len(dfa.states))
+		stats.count('subset.transitions', sum(len(transitions) for transitions in dfa.transitions.values()))
 	return dfa  # Retorna el DFA resultante.
 
 
 
-def visualize_dfa(dfa, name):
-	dot = Digraph()
-	dot.attr('node', shape='circle')
-
-	# Marcar el estado inicial con un nodo doble
-	dot.node("start", shape="none", label="")
-	dot.edge("start", dfa.initial_state)
-
-	# Crear nodos para cada estado, marcando los estados de aceptación con doble círculo
-	for state in dfa.states:
-		if state in dfa.accept_states:
-			dot.node(state, shape='circle')
-		else:
-			dot.node(state)
-
-	# Agregar transiciones
-	for from_state, transitions in dfa.transitions.items():
-		for symbol, to_state in transitions.items():
-			dot.edge(from_state, to_state, label=symbol)
-
-	# Renderizar y visualizar el DFA
-	dot.render(f'dfa_{name}', view=True, cleanup=True)
+# Visualiza el DFA con Graphviz (ver visualization.py); los estados de aceptación se marcan con doble círculo.
+# 'directory' indica dónde guardar el PDF y 'view' si se abre el visor al terminar.
+def visualize_dfa(dfa, name, directory=None, view=True):
+	from visualization import dfa_graph, render
+	return render(dfa_graph(dfa), f'dfa_{name}', directory, view)
 
 
 def simulate_dfa(dfa, input_string):
 	# El estado actual se maneja como un conjunto para imitar la estructura del AFN, aunque siempre será de un solo elemento
 	current_states = {dfa.initial_state}
 
-	for symbol in input_string:
+	for char in input_string:
+		# Símbolo del alfabeto (el carácter mismo o la clase de caracteres que lo contiene)
+		symbol = dfa.resolve_symbol(char)
 		next_states = set()  # Preparar el siguiente conjunto de estados (será siempre de máximo un estado en DFA)
 		for current_state in current_states:
 			# Verifica si existe una transición para el símbolo actual desde el estado actual
@@ -134,18 +198,21 @@ def simulate_dfa(dfa, input_string):
 	return any(state in dfa.accept_states for state in current_states)
 
 
-def build_minimized_dfa(dfa, partition_map, partitions):
+def build_minimized_dfa(dfa, partition_map, partitions, minimized_dfa=None):
 	"""
 	Construye el DFA minimizado a partir de las particiones finales.
+	'minimized_dfa' permite pasar un DFA vacío (por ejemplo, de una subclase) a llenar.
 	"""
-	minimized_dfa = DFA()
+	if minimized_dfa is None:
+		minimized_dfa = DFA()
 	state_name_map = {}  # Mapea índices de partición a nombres de nuevos estados
+	accept_states = set(dfa.accept_states)
 	
 	# Crear nuevos estados en el DFA minimizado
 	for partition_index, partition in enumerate(partitions):
 		state_name = f"S{partition_index}"  # Nombre del nuevo estado
 		state_name_map[partition_index] = state_name
-		minimized_dfa.add_state(state_name, is_accept=any(state in dfa.accept_states for state in partition))
+		minimized_dfa.add_state(state_name, is_accept=any(state in accept_states for state in partition))
 	
 	# Establecer el estado inicial
 	for state in dfa.states:
@@ -159,6 +226,9 @@ def build_minimized_dfa(dfa, partition_map, partitions):
 		for symbol in dfa.alphabet:
 			if representative_state in dfa.transitions and symbol in dfa.transitions[representative_state]:
 				target_state = dfa.transitions[representative_state][symbol]
+				# Los estados muertos descartados por la minimización no tienen partición
+				if target_state not in partition_map:
+					continue
 				minimized_dfa.add_transition(
 					state_name_map[partition_index], 
 					symbol, 
@@ -167,10 +237,14 @@ def build_minimized_dfa(dfa, partition_map, partitions):
 				
 	return minimized_dfa
 
+# Refinamiento de particiones estilo Moore: divide cada bloque contra cada símbolo hasta que no haya cambios.
 def refine_partitions(dfa, partition_map, partitions):
+	symbols = sorted(dfa.alphabet, key=str)
 	changed = True
+	rounds = 0
 	while changed:
 		changed = False
+		rounds += 1
 		new_partitions = []
 		new_partition_map = {}
 		
@@ -181,7 +255,7 @@ def refine_partitions(dfa, partition_map, partitions):
 			for state in partition:
 				# Clave para agrupar: una tupla de las particiones de destino para cada símbolo del alfabeto
 				# Maneja transiciones no definidas asignando un valor especial (por ejemplo, -1)
-				group_key = tuple(partition_map.get(dfa.transitions[state].get(symbol), -1) for symbol in sorted(dfa.alphabet))
+				group_key = tuple(partition_map.get(dfa.transitions[state].get(symbol), -1) for symbol in symbols)
 				
 				if group_key not in transition_groups:
 					transition_groups[group_key] = []
@@ -198,6 +272,8 @@ def refine_partitions(dfa, partition_map, partitions):
 		partitions = new_partitions
 		partition_map = new_partition_map
 	
+	if instrumentation.collector is not None:
+		instrumentation.collector.count('refine_partitions.rounds', rounds)
 	return partition_map, partitions
 
 
@@ -209,9 +285,10 @@ def initial_partition(dfa):
 	"""
 	partition_map = {}  # Mapea cada estado a su partición (0 o 1)
 	partitions = [[], []]  # [0] para no aceptadores, [1] para aceptadores
+	accept_states = set(dfa.accept_states)
 	
 	for state in dfa.states:
-		if state in dfa.accept_states:
+		if state in accept_states:
 			partition_map[state] = 1  # Estado de aceptación
 			partitions[1].append(state)
 		else:
@@ -244,18 +321,127 @@ def remove_unreachable_states(dfa):
 	dfa.accept_states = [state for state in dfa.accept_states if state in reachable_states]
 
 
-def minimize_dfa(dfa):
+def hopcroft_partitions(dfa, labels=None):
+	"""
+	Calcula las particiones finales con el algoritmo de Hopcroft, O(n·k·log n).
+	Usa una lista de trabajo de bloques divisores e índices de transiciones inversas.
+	Las transiciones no definidas se dirigen a un estado sumidero implícito; los estados
+	equivalentes a ese sumidero (estados muertos) se descartan del resultado.
+	'labels' opcionalmente mapea estados a etiquetas que deben distinguirse desde el inicio
+	(por ejemplo, los patrones que acepta cada estado); por defecto se usan los estados de aceptación.
+	Retorna (partition_map, partitions) en el mismo formato que refine_partitions.
+	"""
+	states = dfa.states
+	state_index = {state: i for i, state in enumerate(states)}
+	sink = len(states)  # Estado sumidero implícito para transiciones no definidas
+	symbols = sorted(dfa.alphabet, key=str)
+
+	# Índices inversos: inverse[a][t] es la lista de estados que llegan a t con el símbolo a
+	inverse = [{} for _ in symbols]
+	for state in states:
+		source = state_index[state]
+		transitions = dfa.transitions.get(state, {})
+		for symbol_index, symbol in enumerate(symbols):
+			target = state_index.get(transitions.get(symbol), sink)
+			inverse[symbol_index].setdefault(target, []).append(source)
+	for symbol_index in range(len(symbols)):
+		inverse[symbol_index].setdefault(sink, []).append(sink)
+
+	# Partición inicial: un bloque por etiqueta; el sumidero y los estados sin etiqueta comparten bloque
+	if labels is None:
+		labels = {state: True for state in dfa.accept_states}
+	initial_blocks = {}
+	for state in states:
+		initial_blocks.setdefault(labels.get(state), set()).add(state_index[state])
+	initial_blocks.setdefault(None, set()).add(sink)
+	blocks = list(initial_blocks.values())
+	block_of = [0] * (sink + 1)
+	for block_id, block in enumerate(blocks):
+		for state in block:
+			block_of[state] = block_id
+
+	# Basta con agregar todos los bloques salvo el más grande a la lista de trabajo
+	largest = max(range(len(blocks)), key=lambda b: len(blocks[b]))
+	worklist = [block_id for block_id in range(len(blocks)) if block_id != largest]
+	in_worklist = set(worklist)
+	rounds = 0
+
+	while worklist:
+		rounds += 1
+		splitter_id = worklist.pop()
+		in_worklist.discard(splitter_id)
+		splitter = list(blocks[splitter_id])
+
+		for symbol_inverse in inverse:
+			# Estados que llegan al bloque divisor con este símbolo, agrupados por su bloque actual
+			touched = {}
+			for target in splitter:
+				for source in symbol_inverse.get(target, ()):
+					touched.setdefault(block_of[source], set()).add(source)
+
+			for block_id, intersection in touched.items():
+				block = blocks[block_id]
+				if len(intersection) == len(block):
+					continue
+
+				# Divide el bloque: la intersección pasa a ser un bloque nuevo
+				block -= intersection
+				new_block_id = len(blocks)
+				blocks.append(intersection)
+				for state in intersection:
+					block_of[state] = new_block_id
+
+				if block_id in in_worklist:
+					worklist.append(new_block_id)
+					in_worklist.add(new_block_id)
+				else:
+					smaller = block_id if len(block) <= len(intersection) else new_block_id
+					worklist.append(smaller)
+					in_worklist.add(smaller)
+
+	# Descarta el sumidero y, salvo que contenga al estado inicial, todo su bloque de estados muertos
+	dead_block = block_of[sink]
+	initial_index = state_index.get(dfa.initial_state)
+	ordered_blocks = []
+	for block_id, block in enumerate(blocks):
+		block = sorted(block - {sink})
+		if not block or (block_id == dead_block and initial_index not in block):
+			continue
+		ordered_blocks.append(block)
+
+	stats = instrumentation.collector
+	if stats is not None:
+		stats.count('hopcroft.rounds', rounds)
+		stats.count('hopcroft.blocks', len(ordered_blocks))
+
+	# El bloque del estado inicial queda primero para que el DFA minimizado inicie en S0
+	ordered_blocks.sort(key=lambda block: (initial_index not in block, block[0]))
+	partitions = [[states[i] for i in block] for block in ordered_blocks]
+	partition_map = {state: partition_index for partition_index, partition in enumerate(partitions) for state in partition}
+
+	return partition_map, partitions
+
+
+@timed('minimize')
+def minimize_dfa(dfa, algorithm='hopcroft'):
 	"""
 	Función que encapsula los pasos de minimización de un DFA.
+	'algorithm' puede ser 'hopcroft' (por defecto) o 'moore' (refine_partitions), útil para comparar.
 	"""
 	# Paso 1: Eliminar estados inalcanzables
 	remove_unreachable_states(dfa)
 	
-	# Paso 2: Crear particiones iniciales
-	partition_map, partitions = initial_partition(dfa)
-	
-	# Paso 3: Refinar particiones
-	partition_map, partitions = refine_partitions(dfa, partition_map, partitions)
+	if algorithm == 'hopcroft':
+		# Pasos 2 y 3: Particiones iniciales y refinamiento con Hopcroft
+		partition_map, partitions = hopcroft_partitions(dfa)
+	elif algorithm == 'moore':
+		# Paso 2: Crear particiones iniciales
+		partition_map, partitions = initial_partition(dfa)
+		
+		# Paso 3: Refinar particiones
+		partition_map, partitions = refine_partitions(dfa, partition_map, partitions)
+	else:
+		raise ValueError(f"Algoritmo de minimización desconocido: '{algorithm}'.")
 	
 	# Paso 4: Construir el DFA minimizado
 	minimized_dfa = build_minimized_dfa(dfa, partition_map, partitions)
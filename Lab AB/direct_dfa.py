@@ -1,138 +1,164 @@
+from collections import deque
+
 from dfa import DFA
+from char_class import partition_alphabet
+from syntax_tree import expand_repeats
+import instrumentation
+from instrumentation import timed
+
+# Operadores del árbol y la cadena vacía, que no ocupan posición
+OPERATORS = frozenset('*+?|.ε')
 
-# Clase DirectDFA para construir un DFA directamente a partir de un rbol sintctico de una expresin regular.
+# Clase DirectDFA para construir un DFA directamente a partir de un árbol sintáctico de una expresión regular.
 class DirectDFA:
 	def __init__(self, root):
 		self.root = root
 		self.dfa = DFA()
-		self.positions = {}  # Mapea nodos a sus posiciones
+		self.positions = {}  # Mapea nodos hoja a sus posiciones
+		self.position_symbols = [None]  # Símbolo de cada posición (las posiciones inician en 1)
+		self.symbol_positions = {}  # Mapea cada símbolo al conjunto de posiciones donde aparece
 		self.followpos = {}  # Mapea posiciones a sus followpos
+		self.nullable = {}  # Mapea nodos a si pueden derivar la cadena vacía
+		self.firstpos = {}  # Mapea nodos a su conjunto firstpos
+		self.lastpos = {}  # Mapea nodos a su conjunto lastpos
 		self.state_counter = 0
-		self.alphabet = set()  # Conjunto de smbolos del alfabeto
+		self.alphabet = set()  # Conjunto de símbolos del alfabeto
 
-	# Mtodo principal para construir el DFA.
+	# Método principal para construir el DFA.
+	@timed('direct_dfa')
 	def build(self):
+		# Cada copia de una repetición {m,n} necesita sus propias posiciones
+		self.root = expand_repeats(self.root)
 		self.initialize_positions(self.root)
 		self.calculate_followpos(self.root)
 		self.construct_dfa()
-		
-	 # Determina si un conjunto de estados incluye el estado de aceptacin.
-	def is_accept_state(self, state_set):
-		# Asume que el estado de aceptacin incluye la posicin del smbolo '#'
-		# Primero, encuentra la posicin del smbolo '#' en el rbol sintctico
-		# Esto asume que ya has asignado posiciones a cada nodo en el rbol
-		accept_pos = self.positions[next(node for node in self.positions if node.value == '#')]
-		# Luego, verifica si el conjunto de estados (state_set) incluye esa posicin
-		return accept_pos in state_set
 
-	# Asigna posiciones a los nodos del rbol y prepara los conjuntos followpos.
-	def initialize_positions(self, node, pos=[1]):
-		if node.value not in '*|.':
-			# Nodo hoja (operando)
-			self.positions[node] = pos[0]
-			self.followpos[pos[0]] = set()
-			self.alphabet.add(node.value)
-			pos[0] += 1
-		else:
-			# Nodo interno (operador)
-			for child in node.children:
-				self.initialize_positions(child, pos)
-
-	 # Calcula los conjuntos followpos para cada nodo.
+		stats = instrumentation.collector
+		if stats is not None:
+			stats.count('direct_dfa.positions', len(self.followpos))
+			for follow in self.followpos.values():
+				stats.observe('followpos.size', len(follow))
+			stats.count('direct_dfa.states', len(self.dfa.states))
+
+	# Recorre el árbol en post-orden de forma iterativa (los hijos antes que su padre).
+	def postorder(self, root):
+		stack = [(root, False)]
+		while stack:
+			node, children_done = stack.pop()
+			if children_done:
+				yield node
+			else:
+				stack.append((node, True))
+				for child in reversed(node.children):
+					stack.append((child, False))
+
+	# Asigna posiciones a los nodos hoja del árbol, de izquierda a derecha, y prepara los conjuntos followpos.
+	# La cadena vacía 'ε' no ocupa posición.
+	def initialize_positions(self, node):
+		for current in self.postorder(node):
+			if current.value not in OPERATORS:
+				# Nodo hoja (operando)
+				pos = len(self.position_symbols)
+				self.positions[current] = pos
+				self.position_symbols.append(current.value)
+				self.symbol_positions.setdefault(current.value, set()).add(pos)
+				self.followpos[pos] = set()
+				self.alphabet.add(current.value)
+
+	# Calcula nullable, firstpos y lastpos de cada nodo y los conjuntos followpos en una sola pasada post-orden.
 	def calculate_followpos(self, node):
-		if node.value == '.':
-			# Concatenacin: lastpos(n1) -> firstpos(n2)
-			lastpos_n1 = self.get_lastpos(node.children[0])
-			firstpos_n2 = self.get_firstpos(node.children[1])
-			for pos in lastpos_n1:
-				self.followpos[pos].update(firstpos_n2)
-		elif node.value == '*':
-			# Cierre de Kleene: lastpos(n) -> firstpos(n)
-			lastpos_n = self.get_lastpos(node)
-			firstpos_n = self.get_firstpos(node)
-			for pos in lastpos_n:
-				self.followpos[pos].update(firstpos_n)
-		for child in node.children:
-			self.calculate_followpos(child)
-
-	# Obtiene los conjuntos firstpos y lastpos para un nodo.
+		for current in self.postorder(node):
+			if current.value == '.':
+				left, right = current.children
+				# Concatenación: lastpos(n1) -> firstpos(n2)
+				for pos in self.lastpos[left]:
+					self.followpos[pos].update(self.firstpos[right])
+				self.nullable[current] = self.nullable[left] and self.nullable[right]
+				self.firstpos[current] = self.firstpos[left] | self.firstpos[right] if self.nullable[left] else self.firstpos[left]
+				self.lastpos[current] = self.lastpos[left] | self.lastpos[right] if self.nullable[right] else self.lastpos[right]
+			elif current.value == '|':
+				left, right = current.children
+				self.nullable[current] = self.nullable[left] or self.nullable[right]
+				self.firstpos[current] = self.firstpos[left] | self.firstpos[right]
+				self.lastpos[current] = self.lastpos[left] | self.lastpos[right]
+			elif current.value == '*':
+				child = current.children[0]
+				self.nullable[current] = True
+				self.firstpos[current] = self.firstpos[child]
+				self.lastpos[current] = self.lastpos[child]
+				# Cierre de Kleene: lastpos(n) -> firstpos(n)
+				for pos in self.lastpos[current]:
+					self.followpos[pos].update(self.firstpos[current])
+			elif current.value == '+':
+				child = current.children[0]
+				self.nullable[current] = self.nullable[child]
+				self.firstpos[current] = self.firstpos[child]
+				self.lastpos[current] = self.lastpos[child]
+				# Una o más repeticiones: igual que el cierre de Kleene, lastpos(n) -> firstpos(n)
+				for pos in self.lastpos[current]:
+					self.followpos[pos].update(self.firstpos[current])
+			elif current.value == '?':
+				child = current.children[0]
+				self.nullable[current] = True
+				self.firstpos[current] = self.firstpos[child]
+				self.lastpos[current] = self.lastpos[child]
+			elif current.value == 'ε':
+				self.nullable[current] = True
+				self.firstpos[current] = frozenset()
+				self.lastpos[current] = frozenset()
+			else:
+				pos = frozenset([self.positions[current]])
+				self.nullable[current] = False
+				self.firstpos[current] = pos
+				self.lastpos[current] = pos
+
+	# Obtiene los conjuntos firstpos y lastpos ya calculados para un nodo.
 	def get_firstpos(self, node):
-		if node.value in '*|.':
-			if node.value == '*':
-				return self.get_firstpos(node.children[0])
-			elif node.value == '|':
-				return self.get_firstpos(node.children[0]).union(self.get_firstpos(node.children[1]))
-			elif node.value == '.':
-				if self.is_nullable(node.children[0]):
-					return self.get_firstpos(node.children[0]).union(self.get_firstpos(node.children[1]))
-				else:
-					return self.get_firstpos(node.children[0])
-		else:
-			return {self.positions[node]}
+		return self.firstpos[node]
 
 	def get_lastpos(self, node):
-		if node.value in '*|.':
-			if node.value == '*':
-				return self.get_lastpos(node.children[0])
-			elif node.value == '|':
-				return self.get_lastpos(node.children[0]).union(self.get_lastpos(node.children[1]))
-			elif node.value == '.':
-				if self.is_nullable(node.children[1]):
-					return self.get_lastpos(node.children[0]).union(self.get_lastpos(node.children[1]))
-				else:
-					return self.get_lastpos(node.children[1])
-		else:
-			return {self.positions[node]}
-
-	# Verifica si un nodo puede derivar la cadena vaca.
+		return self.lastpos[node]
+
+	# Verifica si un nodo puede derivar la cadena vacía.
 	def is_nullable(self, node):
-		if node.value == '*':
-			return True
-		elif node.value == '|':
-			return self.is_nullable(node.children[0]) or self.is_nullable(node.children[1])
-		elif node.value == '.':
-			return self.is_nullable(node.children[0]) and self.is_nullable(node.children[1])
-		else:
-			return False
+		return self.nullable[node]
 
 	# Construye el DFA utilizando los conjuntos firstpos, lastpos y followpos.
 	def construct_dfa(self):
-		state_names = {}  # Mapea frozensets a nombres de estados
-		state_name_counter = [0]  # Usamos una lista para poder modificarlo dentro de get_state_name
+		state_names = {}  # Mapea frozensets de posiciones a nombres de estados
 
 		def get_state_name(state_set):
 			# Devuelve un nombre de estado existente o genera uno nuevo
 			if state_set not in state_names:
-				# Accedemos al contador usando state_name_counter[0]
-				state_names[state_set] = f'S{state_name_counter[0]}'
-				state_name_counter[0] += 1
+				state_names[state_set] = f'S{len(state_names)}'
+				self.dfa.add_state(state_names[state_set], is_accept=self.is_accept_state(state_set))
 			return state_names[state_set]
 
+		# Las etiquetas (caracteres o clases) se dividen en símbolos atómicos disjuntos
+		symbol_atoms = partition_alphabet(self.symbol_positions)
+
 		initial_state = frozenset(self.get_firstpos(self.root))
-		self.dfa.add_state(get_state_name(initial_state), is_accept=self.is_accept_state(initial_state))
 		self.dfa.set_initial_state(get_state_name(initial_state))
-		unmarked_states = [initial_state]
-		marked_states = set()
+		unmarked_states = deque([initial_state])
 
 		while unmarked_states:
-			S = unmarked_states.pop()
-			marked_states.add(S)
-			for a in self.alphabet:
-				move = set()
-				for pos in S:
-					# Asegurarse de que se refiere al valor correcto y no al nodo directamente
-					if pos in self.positions.values() and a == list(self.positions.keys())[list(self.positions.values()).index(pos)].value:
-						move.update(self.followpos[pos])
+			S = unmarked_states.popleft()
+			# Agrupa los followpos de las posiciones de S según el símbolo de cada posición
+			moves = {}
+			for pos in S:
+				follow = self.followpos[pos]
+				if follow:
+					for atom in symbol_atoms[self.position_symbols[pos]]:
+						moves.setdefault(atom, set()).update(follow)
+
+			for a, move in moves.items():
 				U = frozenset(move)
-				if U not in marked_states and U not in unmarked_states:
-					self.dfa.add_state(get_state_name(U), is_accept=self.is_accept_state(U))
+				if U not in state_names:
 					unmarked_states.append(U)
-				if U:
-					self.dfa.add_transition(get_state_name(S), a, get_state_name(U))
-
-
+				self.dfa.add_transition(get_state_name(S), a, get_state_name(U))
 
+	# Determina si un conjunto de posiciones incluye la posición de aceptación.
 	def is_accept_state(self, state_set):
-		# Asume que el estado de aceptacin es el ltimo nodo hoja aadido
-		accept_pos = max(self.positions.values())
-		return accept_pos in state_set
\ No newline at end of file
+		# El estado de aceptación es la última posición, que corresponde al símbolo de fin '#'
+		accept_pos = len(self.position_symbols) - 1
+		return accept_pos in state_set
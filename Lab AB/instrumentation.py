@@ -0,0 +1,100 @@
+from contextlib import contextmanager
+from functools import wraps
+from time import perf_counter
+
+# Instrumentación opcional de la construcción de autómatas.
+#
+# Mientras no haya un colector activo, cada punto de medición cuesta solo una comparación con None
+# y los contadores se calculan al final de cada etapa, nunca dentro de sus ciclos internos.
+# Para medir, se envuelve el trabajo con collect_stats():
+#
+#     with collect_stats() as stats:
+#         compile('(a|b)*abb').minimized_dfa
+#     stats.as_dict()
+#
+# El colector es global al proceso; no está pensado para medir varios hilos a la vez.
+
+# Colector activo, o None si la instrumentación está desactivada
+collector = None
+
+
+# Clase ConstructionStats: acumula contadores, distribuciones y tiempos por etapa.
+# Si se pasa 'callback', también se le notifica cada medición como callback(tipo, nombre, valor),
+# con tipo 'count', 'observe' o 'time', para enviarlas directamente a un sistema de métricas.
+class ConstructionStats:
+	def __init__(self, callback=None):
+		self.counters = {}  # Nombre -> valor acumulado
+		self.distributions = {}  # Nombre -> {'count', 'total', 'max'} de los valores observados
+		self.phases = {}  # Etapa -> {'calls', 'time'} con el tiempo acumulado en segundos
+		self.running = set()  # Etapas que se están midiendo en este momento
+		self.callback = callback
+
+	# Suma 'amount' al contador 'name'.
+	def count(self, name, amount=1):
+		self.counters[name] = self.counters.get(name, 0) + amount
+		if self.callback is not None:
+			self.callback('count', name, amount)
+
+	# Registra un valor de una distribución (por ejemplo, el tamaño de un cierre epsilon).
+	def observe(self, name, value):
+		distribution = self.distributions.get(name)
+		if distribution is None:
+			distribution = self.distributions[name] = {'count': 0, 'total': 0, 'max': value}
+		distribution['count'] += 1
+		distribution['total'] += value
+		if value > distribution['max']:
+			distribution['max'] = value
+		if self.callback is not None:
+			self.callback('observe', name, value)
+
+	# Acumula el tiempo de una llamada a una etapa.
+	def add_time(self, phase, seconds):
+		timing = self.phases.get(phase)
+		if timing is None:
+			timing = self.phases[phase] = {'calls': 0, 'time': 0.0}
+		timing['calls'] += 1
+		timing['time'] += seconds
+		if self.callback is not None:
+			self.callback('time', phase, seconds)
+
+	# Retorna las mediciones como un diccionario serializable a JSON.
+	def as_dict(self):
+		distributions = {
+			name: dict(values, mean=values['total'] / values['count'])
+			for name, values in self.distributions.items()
+		}
+		return {'counters': dict(self.counters), 'distributions': distributions, 'phases': {name: dict(values) for name, values in self.phases.items()}}
+
+
+# Activa un colector durante el bloque 'with' y lo retorna. Al salir se restaura el anterior,
+# por lo que los bloques pueden anidarse.
+@contextmanager
+def collect_stats(callback=None):
+	global collector
+	previous = collector
+	collector = ConstructionStats(callback)
+	try:
+		yield collector
+	finally:
+		collector = previous
+
+
+# Decorador que mide el tiempo de una etapa cuando hay un colector activo.
+# Las llamadas anidadas a la misma etapa, aunque sean de funciones distintas, se cuentan una sola
+# vez (solo la más externa); el colector registra qué etapas están en curso.
+def timed(phase):
+	def decorator(function):
+		@wraps(function)
+		def wrapper(*args, **kwargs):
+			stats = collector
+			if stats is None or phase in stats.running:
+				return function(*args, **kwargs)
+			stats.running.add(phase)
+			start = perf_counter()
+			try:
+				return function(*args, **kwargs)
+			finally:
+				stats.running.discard(phase)
+				stats.add_time(phase, perf_counter() - start)
+		return wrapper
+	return decorator
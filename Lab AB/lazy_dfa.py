@@ -0,0 +1,68 @@
+from dfa import epsilon_closure, move
+from nfa import CompactNFA, to_compact
+
+# Clase LazyDFA: DFA construido bajo demanda sobre el NFA de Thompson.
+# Los estados del DFA (cierres epsilon de conjuntos de estados del NFA) se crean solo cuando la
+# entrada los alcanza por primera vez y se guardan en una caché acotada. Cuando la caché se llena
+# se vacía por completo y se sigue construyendo desde el estado actual.
+class LazyDFA:
+	def __init__(self, nfa, max_states=4096):
+		if max_states < 2:
+			raise ValueError("La caché del DFA perezoso necesita al menos 2 estados.")
+		self.nfa = nfa if isinstance(nfa, CompactNFA) else to_compact(nfa)
+		self.max_states = max_states  # Cantidad máxima de estados DFA en caché.
+		self.initial_set = frozenset(epsilon_closure({self.nfa.initial}, self.nfa))
+		self.flush_count = 0  # Cantidad de veces que se vació la caché por estar llena.
+		self.flush()
+
+	# Vacía la caché de estados y transiciones.
+	def flush(self):
+		self.state_ids = {}  # Mapea conjuntos de estados NFA a identificadores de estado DFA
+		self.state_sets = []  # Conjunto de estados NFA de cada estado DFA
+		self.accepting = []  # Indica si cada estado DFA es de aceptación
+		self.transitions = []  # Transiciones ya calculadas: {símbolo: estado_destino} por estado
+
+	# Retorna el identificador del estado DFA para un conjunto de estados NFA, creándolo si no existe.
+	def get_state(self, nfa_states):
+		state = self.state_ids.get(nfa_states)
+		if state is None:
+			state = len(self.state_sets)
+			self.state_ids[nfa_states] = state
+			self.state_sets.append(nfa_states)
+			self.accepting.append(self.nfa.accept in nfa_states)
+			self.transitions.append({})
+		return state
+
+	# Calcula (y guarda en caché) la transición de 'state' con 'symbol'. Retorna el estado destino,
+	# que puede tener un identificador distinto si la caché se vació en el proceso.
+	def compute_transition(self, state, symbol):
+		nfa_states = self.state_sets[state]
+		target_states = frozenset(epsilon_closure(move(nfa_states, symbol, self.nfa), self.nfa))
+
+		if target_states not in self.state_ids and len(self.state_sets) >= self.max_states:
+			self.flush()
+			self.flush_count += 1
+			state = self.get_state(nfa_states)
+
+		target = self.get_state(target_states)
+		self.transitions[state][symbol] = target
+		return target
+
+	# Simula el DFA perezoso sobre la cadena de entrada.
+	def match(self, input_string):
+		state = self.get_state(self.initial_set)
+
+		for symbol in input_string:
+			target = self.transitions[state].get(symbol)
+			if target is None:
+				target = self.compute_transition(state, symbol)
+			# El conjunto vacío es el estado muerto: ya no se puede aceptar
+			if not self.state_sets[target]:
+				return False
+			state = target
+
+		return self.accepting[state]
+
+	@property
+	def num_states(self):
+		return len(self.state_sets)
@@ -1,8 +1,10 @@
+import sys
+
 from regex_parser import ShuntingYard
 from syntax_tree import SyntaxTree
-from nfa import match, Thompson, visualize_nfa
-from dfa import dfa_from_nfa, visualize_dfa, simulate_dfa, minimize_dfa
-from direct_dfa import DirectDFA
+from nfa import match, visualize_nfa
+from dfa import visualize_dfa, simulate_dfa
+from pattern import compile as compile_pattern
 
 def main():
 	# Crear una instancia de la clase ShuntingYard 
@@ -12,8 +14,12 @@ def main():
 	# Solicitar al usuario que ingrese la expresión regular infix
 	infix_regex = input("Ingresa la expresión regular infix: ")
 	
-	# Convertir la expresion regular infix a postfix
-	success, postfix_regex = sy.infix_to_postfix(infix_regex)
+	# Compilar la expresion regular; cada etapa se construye una sola vez y queda en caché
+	try:
+		pattern = compile_pattern(infix_regex)
+		success, postfix_regex = True, pattern.postfix
+	except ValueError as e:
+		success, postfix_regex = False, str(e)
 	
 	if success:
 		# Imprimir el resultado
@@ -21,12 +27,12 @@ def main():
 		print(f"Expresión Regular Postfix: {postfix_regex}\n")
 	
 		# Construccion y visualizacion del arbol sintactico
-		root = st.build_tree(postfix_regex)
+		root = pattern.tree
 		tree_dot = st.visualize_tree(root)
 		tree_dot.render(f'arbol_sintactico', view=True, cleanup=True)
 		
 		# Construccion y visualizacion del afn
-		nfa = Thompson(postfix_regex)
+		nfa = pattern.nfa
 		visualize_nfa(nfa.initial, nfa.accept)
 		
 		# Solicitar al usuario que ingrese la cadena a comprobar
@@ -41,7 +47,7 @@ def main():
 			print("La cadena NO coincide con la expresión regular.\n")
 
 		# Construccion y visualizacion de AFD a partir del AFN
-		dfa = dfa_from_nfa(nfa)
+		dfa = pattern.dfa
 		visualize_dfa(dfa, "regular")
 		
 		# Solicitar al usuario que ingrese la cadena a comprobar
@@ -56,21 +62,21 @@ def main():
 			print("La cadena NO coincide con la expresión regular.\n")
 			
 		# Minimizacion de AFD
-		minimized_dfa = minimize_dfa(dfa)
+		minimized_dfa = pattern.minimized_dfa
 		visualize_dfa(minimized_dfa, "minimizado")
 		
 		# Construccion directa de AFD
 		print("Construcción directa del AFD a partir del árbol sintáctico.")
-		# Convertir la expresion regular infix a postfix, incluyendo el símbolo de fin
-		success, postfix_regex = sy.infix_to_postfix(infix_regex + '#')
-		root_dic = st.build_tree(postfix_regex)
-		direct_dfa = DirectDFA(root_dic)
-		direct_dfa.build()
-		visualize_dfa(direct_dfa.dfa, "directo")
+		# El patrón compilado agrega el símbolo de fin '#' antes de la construcción directa
+		visualize_dfa(pattern.direct_dfa, "directo")
 		
 
 	else:
 		print(f"Expresión Regular no válida: {postfix_regex}")
 
 if __name__ == "__main__":
+	if len(sys.argv) > 1:
+		# Con argumentos se usa el modo no interactivo (ver cli.py)
+		from cli import main as cli_main
+		sys.exit(cli_main())
 	main()
@@ -0,0 +1,155 @@
+from collections import deque
+
+from regex_parser import ShuntingYard
+from nfa import CompactNFA, thompson_compact
+from dfa import DFA, epsilon_closure, move, nfa_labels, remove_unreachable_states, hopcroft_partitions, build_minimized_dfa
+from compiled_dfa import compile_dfa
+from char_class import partition_alphabet
+
+# Clase TaggedDFA: DFA cuyos estados guardan el conjunto de patrones que aceptan en ese punto.
+class TaggedDFA(DFA):
+	def __init__(self):
+		super().__init__()
+		self.tags = {}  # Mapea cada estado de aceptación a un frozenset de identificadores de patrón.
+
+
+# Une los NFA de varios patrones en un único CompactNFA con un estado inicial común.
+# Retorna el NFA combinado y un diccionario {estado de aceptación: identificador de patrón}.
+def merge_nfas(nfas):
+	merged = CompactNFA()
+	accept_tags = {}
+	initials = []
+
+	for pattern_id, nfa in enumerate(nfas):
+		offset = len(merged)
+		for state in range(len(nfa)):
+			edge1, edge2 = nfa.edge1[state], nfa.edge2[state]
+			merged.add_state(
+				nfa.label[state],
+				edge1 + offset if edge1 >= 0 else -1,
+				edge2 + offset if edge2 >= 0 else -1,
+			)
+		initials.append(nfa.initial + offset)
+		accept_tags[nfa.accept + offset] = pattern_id
+
+	# Cadena de bifurcaciones epsilon desde el estado inicial común hacia cada patrón
+	next_split = -1
+	for initial in reversed(initials):
+		next_split = merged.add_state(None, initial, next_split)
+	merged.initial = next_split
+	return merged, accept_tags
+
+
+# Error al superar el límite de estados del DFA combinado.
+class StateLimitError(ValueError):
+	pass
+
+
+# Construcción de subconjuntos que etiqueta cada estado DFA con los patrones que llegan a aceptación.
+# Con 'max_states' lanza StateLimitError en cuanto el DFA supera esa cantidad de estados.
+def tagged_dfa_from_nfa(nfa, accept_tags, max_states=None):
+	dfa = TaggedDFA()
+
+	def add_state(name, closure):
+		tags = frozenset(accept_tags[state] for state in closure if state in accept_tags)
+		dfa.add_state(name, is_accept=bool(tags))
+		if tags:
+			dfa.tags[name] = tags
+
+	label_atoms = partition_alphabet(nfa_labels(nfa))  # Átomos del alfabeto que forman cada etiqueta.
+	initial_closure = frozenset(epsilon_closure({nfa.initial}, nfa))
+	dfa_state_mapping = {initial_closure: 'S0'}
+	dfa.set_initial_state('S0')
+	add_state('S0', initial_closure)
+	unprocessed_states = deque([('S0', initial_closure)])
+
+	while unprocessed_states:
+		dfa_state_name, nfa_states = unprocessed_states.popleft()
+		symbols = set()
+		for state in nfa_states:
+			if nfa.label[state] is not None:
+				symbols.update(label_atoms[nfa.label[state]])
+		for symbol in symbols:
+			closure = frozenset(epsilon_closure(move(nfa_states, symbol, nfa), nfa))
+			if closure not in dfa_state_mapping:
+				if max_states is not None and len(dfa_state_mapping) >= max_states:
+					raise StateLimitError(f"El DFA combinado supera el límite de {max_states} estados.")
+				new_dfa_state_name = f'S{len(dfa_state_mapping)}'
+				dfa_state_mapping[closure] = new_dfa_state_name
+				add_state(new_dfa_state_name, closure)
+				unprocessed_states.append((new_dfa_state_name, closure))
+			dfa.add_transition(dfa_state_name, symbol, dfa_state_mapping[closure])
+
+	return dfa
+
+
+# Minimiza un TaggedDFA: dos estados solo pueden unirse si aceptan exactamente los mismos patrones.
+def minimize_tagged_dfa(dfa):
+	remove_unreachable_states(dfa)
+	partition_map, partitions = hopcroft_partitions(dfa, labels=dfa.tags)
+	minimized_dfa = build_minimized_dfa(dfa, partition_map, partitions, TaggedDFA())
+	for partition_index, partition in enumerate(partitions):
+		tags = dfa.tags.get(partition[0])
+		if tags:
+			minimized_dfa.tags[f"S{partition_index}"] = tags
+	return minimized_dfa
+
+
+# Clase MultiPatternMatcher: compila N expresiones en un único DFA etiquetado.
+# Una sola pasada sobre la entrada indica qué patrones coinciden, o divide la entrada en tokens
+# con la regla de la coincidencia más larga (a igual longitud gana el patrón de menor índice).
+# Con 'max_states' la construcción se detiene con StateLimitError si el DFA combinado crece más.
+class MultiPatternMatcher:
+	def __init__(self, patterns, shunting_yard=None, max_states=None):
+		shunting_yard = shunting_yard or ShuntingYard()
+		self.patterns = list(patterns)
+
+		nfas = []
+		for pattern_id, infix in enumerate(self.patterns):
+			success, postfix = shunting_yard.infix_to_postfix(infix)
+			if not success:
+				raise ValueError(f"Patrón {pattern_id} ('{infix}') no válido: {postfix}")
+			nfas.append(thompson_compact(postfix))
+
+		nfa, accept_tags = merge_nfas(nfas)
+		self.dfa = minimize_tagged_dfa(tagged_dfa_from_nfa(nfa, accept_tags, max_states))
+		self.compiled_dfa = compile_dfa(self.dfa)
+		# Patrones aceptados por cada estado numerado de la tabla compilada
+		self.state_tags = [self.dfa.tags.get(name, frozenset()) for name in self.compiled_dfa.state_names]
+
+	# Retorna la lista ordenada de índices de los patrones que coinciden con la cadena completa.
+	def matches(self, string):
+		state = self.compiled_dfa.final_state(string)
+		if state < 0:
+			return []
+		return sorted(self.state_tags[state])
+
+	# Divide la cadena en tokens (índice de patrón, lexema, posición) con la coincidencia más larga.
+	# Lanza ValueError si en alguna posición ningún patrón reconoce un token no vacío.
+	def tokenize(self, string):
+		compiled = self.compiled_dfa
+		classes, table, num_classes = compiled.symbol_classes, compiled.table, compiled.num_classes
+		position = 0
+
+		while position < len(string):
+			row = compiled.initial
+			last_accept = None  # (fin del token, patrón) de la última aceptación vista
+			index = position
+			while row >= 0 and index < len(string):
+				symbol_class = classes.get(string[index])
+				if symbol_class is None:
+					symbol_class = compiled.classify(string[index])
+					if symbol_class is None:
+						break
+				row = table[row + symbol_class]
+				index += 1
+				if row >= 0:
+					tags = self.state_tags[row // num_classes]
+					if tags:
+						last_accept = (index, min(tags))
+
+			if last_accept is None:
+				raise ValueError(f"Ningún patrón reconoce la entrada en la posición {position}.")
+			end, pattern_id = last_accept
+			yield pattern_id, string[position:end], position
+			position = end
@@ -1,9 +1,17 @@
 
-from graphviz import Digraph
+import weakref
+from array import array
+
+from char_class import CharClass
+from syntax_tree import Repeat, Group
+import instrumentation
+from instrumentation import timed
 
 # Define la clase State para representar un estado en el NFA.
 # Cada estado puede tener etiquetas (para los estados iniciales y de aceptación) y hasta dos aristas de transición.
 class State:
+	__slots__ = ('label', 'edge1', 'edge2')
+
 	def __init__(self, label=None, edge1=None, edge2=None):
 		self.label = label  # La etiqueta del estado (usualmente se usa para estados de aceptación o específicos).
 		self.edge1 = edge1  # Primera arista de transición desde este estado.
@@ -16,12 +24,55 @@ class NFA:
 		self.initial = initial  # El estado inicial del NFA.
 		self.accept = accept  # El estado de aceptación del NFA.
 
+# Define la clase CompactNFA, una representación compacta del NFA.
+# Los estados son índices enteros sobre arreglos paralelos (label, edge1, edge2) en lugar de objetos State.
+# Una arista no definida se representa con -1 y una etiqueta None indica transiciones epsilon.
+# La arista edge1 de una bifurcación es siempre la de mayor prioridad (la rama izquierda de '|' o
+# la que repite en '*', '+', '?' y {m,n}), lo que usa la extracción de capturas (ver pike_vm.py).
+class CompactNFA:
+	__slots__ = ('label', 'edge1', 'edge2', 'initial', 'accept', 'saves', '__weakref__')
+
+	def __init__(self):
+		self.label = []  # Etiqueta de cada estado.
+		self.edge1 = array('l')  # Primera arista de cada estado.
+		self.edge2 = array('l')  # Segunda arista de cada estado.
+		self.initial = -1  # Índice del estado inicial.
+		self.accept = -1  # Índice del estado de aceptación.
+		self.saves = {}  # Estados epsilon que guardan una posición: estado -> ranura de captura.
+
+	def __len__(self):
+		return len(self.label)
+
+	# Agrega un estado nuevo y retorna su índice.
+	def add_state(self, label=None, edge1=-1, edge2=-1):
+		self.label.append(label)
+		self.edge1.append(edge1)
+		self.edge2.append(edge2)
+		return len(self.label) - 1
+
 # La función Thompson realiza la construcción de Thompson para convertir una expresión regular en un NFA.
-def Thompson(postfix):
+# Con compact=True emite directamente un CompactNFA.
+def Thompson(postfix, compact=False):
+	if compact:
+		return thompson_compact(postfix)
+
+	nfa = thompson_states(postfix)
+	# Los estados se cuentan fuera de la etapa medida, para no inflar su tiempo
+	if instrumentation.collector is not None:
+		instrumentation.collector.count('nfa.states', len(to_compact(nfa)))
+	return nfa
+
+# Construcción de Thompson sobre estados State.
+@timed('thompson')
+def thompson_states(postfix):
 	nfa_stack = []  # Una pila para almacenar los NFA intermedios durante la construcción.
 
 	for c in postfix:  # Itera sobre cada caracter en la expresión regular en forma posfija.
-		if c == '*':  # Operador de Kleene: Crea un NFA que acepta 0 o más repeticiones de la expresión anterior.
+		if isinstance(c, Repeat):  # Repetición acotada {m,n}: copias del NFA anterior.
+			nfa_stack.append(repeat_states(nfa_stack.pop(), c))
+		elif isinstance(c, Group):  # Grupo de captura: no cambia el lenguaje; las capturas requieren compact=True.
+			continue
+		elif c == '*':  # Operador de Kleene: Crea un NFA que acepta 0 o más repeticiones de la expresión anterior.
 			nfa1 = nfa_stack.pop()
 			initial, accept = State(), State()
 			initial.edge1, initial.edge2 = nfa1.initial, accept
@@ -50,6 +101,10 @@ def Thompson(postfix):
 			initial.edge1, initial.edge2 = nfa1.initial, accept
 			nfa1.accept.edge1 = accept
 			nfa_stack.append(NFA(initial, accept))
+		elif c == 'ε':  # Cadena vacía: una única transición epsilon.
+			accept, initial = State(), State()
+			initial.edge1 = accept
+			nfa_stack.append(NFA(initial, accept))
 		else:  # Un caracter específico: Crea un NFA básico que acepta ese caracter.
 			accept, initial = State(), State()
 			initial.label, initial.edge1 = c, accept
@@ -57,98 +112,304 @@ def Thompson(postfix):
 
 	return nfa_stack.pop()  # Retorna el NFA resultante.
 
+# Copia los estados de un fragmento NFA de objetos State (los alcanzables desde su estado inicial).
+def copy_fragment(nfa):
+	copies = {nfa.initial: State(nfa.initial.label)}
+	stack = [nfa.initial]
+	while stack:
+		state = stack.pop()
+		for next_state in (state.edge1, state.edge2):
+			if next_state is not None and next_state not in copies:
+				copies[next_state] = State(next_state.label)
+				stack.append(next_state)
+	for state, copy in copies.items():
+		copy.edge1 = copies[state.edge1] if state.edge1 is not None else None
+		copy.edge2 = copies[state.edge2] if state.edge2 is not None else None
+	return NFA(copies[nfa.initial], copies[nfa.accept])
+
+# Construye el NFA de r{m,n} a partir del NFA de r, enlazando sus copias como en repeat_compact.
+def repeat_states(nfa, repeat):
+	count = repeat.max if repeat.max is not None else max(repeat.min, 1)
+	copies = [nfa] + [copy_fragment(nfa) for _ in range(count - 1)]
+
+	exit = State()
+	next_state = exit
+	required = repeat.min
+	if count == 0:
+		next_state = State(None, exit)
+	elif repeat.max is None:
+		last = copies[-1]
+		last.accept.edge1, last.accept.edge2 = last.initial, exit
+		if repeat.min == 0:
+			next_state = State(None, last.initial, exit)
+		else:
+			next_state = last.initial
+			required -= 1
+	else:
+		for copy in reversed(copies[required:]):
+			copy.accept.edge1 = next_state
+			next_state = State(None, copy.initial, exit)
+
+	for copy in reversed(copies[:required]):
+		copy.accept.edge1 = next_state
+		next_state = copy.initial
+
+	return NFA(next_state, exit)
+
+# Construcción de Thompson sobre arreglos: misma estructura que Thompson, pero cada fragmento
+# de la pila es una tupla (primero, inicial, aceptación) de índices dentro de un único CompactNFA.
+# Los estados de un fragmento ocupan el rango contiguo que empieza en 'primero', lo que permite
+# copiarlo en bloque para las repeticiones {m,n}.
+# Un grupo de captura n se rodea de dos estados epsilon que guardan las ranuras 2n (inicio) y
+# 2n + 1 (fin); se registran en nfa.saves y para el resto de los algoritmos son epsilon comunes.
+@timed('thompson')
+def thompson_compact(postfix):
+	nfa = CompactNFA()
+	edge1, edge2 = nfa.edge1, nfa.edge2
+	fragment_stack = []
+
+	for c in postfix:
+		if isinstance(c, Repeat):
+			fragment_stack.append(repeat_compact(nfa, fragment_stack.pop(), c))
+		elif isinstance(c, Group):
+			first, initial1, accept1 = fragment_stack.pop()
+			accept = nfa.add_state()
+			initial = nfa.add_state(None, initial1)
+			edge1[accept1] = accept
+			nfa.saves[initial], nfa.saves[accept] = 2 * c.index, 2 * c.index + 1
+			fragment_stack.append((first, initial, accept))
+		elif c == '*':
+			first, initial1, accept1 = fragment_stack.pop()
+			initial, accept = nfa.add_state(), nfa.add_state()
+			edge1[initial], edge2[initial] = initial1, accept
+			edge1[accept1], edge2[accept1] = initial1, accept
+			fragment_stack.append((first, initial, accept))
+		elif c == '.':
+			_, initial2, accept2 = fragment_stack.pop()
+			first, initial1, accept1 = fragment_stack.pop()
+			edge1[accept1] = initial2
+			fragment_stack.append((first, initial1, accept2))
+		elif c == '|':
+			_, initial2, accept2 = fragment_stack.pop()
+			first, initial1, accept1 = fragment_stack.pop()
+			initial = nfa.add_state(None, initial1, initial2)
+			accept = nfa.add_state()
+			edge1[accept1], edge1[accept2] = accept, accept
+			fragment_stack.append((first, initial, accept))
+		elif c == '+':
+			first, initial1, accept1 = fragment_stack.pop()
+			initial, accept = nfa.add_state(), nfa.add_state()
+			edge1[initial] = initial1
+			edge1[accept1], edge2[accept1] = initial1, accept
+			fragment_stack.append((first, initial, accept))
+		elif c == '?':
+			first, initial1, accept1 = fragment_stack.pop()
+			initial, accept = nfa.add_state(), nfa.add_state()
+			edge1[initial], edge2[initial] = initial1, accept
+			edge1[accept1] = accept
+			fragment_stack.append((first, initial, accept))
+		elif c == 'ε':
+			accept = nfa.add_state()
+			initial = nfa.add_state(None, accept)
+			fragment_stack.append((accept, initial, accept))
+		else:
+			accept = nfa.add_state()
+			initial = nfa.add_state(c, accept)
+			fragment_stack.append((accept, initial, accept))
+
+	_, nfa.initial, nfa.accept = fragment_stack.pop()
+	if instrumentation.collector is not None:
+		instrumentation.collector.count('nfa.states', len(nfa))
+	return nfa
+
+# Construye el fragmento de r{m,n} a partir del fragmento de r, que es el último construido.
+# En lugar de repetir la construcción de r, sus estados se copian en bloque desplazando las aristas.
+# Las copias obligatorias se encadenan; cada copia opcional va precedida de una bifurcación que salta
+# directo a la salida común, y una repetición sin máximo hace de la última copia un ciclo.
+def repeat_compact(nfa, fragment, repeat):
+	first, initial, accept = fragment
+	label, edge1, edge2 = nfa.label, nfa.edge1, nfa.edge2
+	end = len(nfa)
+	count = repeat.max if repeat.max is not None else max(repeat.min, 1)
+
+	# Estados de captura del fragmento, que cada copia también debe guardar
+	saves = [(state, slot) for state, slot in nfa.saves.items() if state >= first]
+
+	copies = [(initial, accept)]
+	for _ in range(count - 1):
+		offset = len(nfa) - first
+		label.extend(label[first:end])
+		edge1.extend(array('l', (edge + offset if edge >= 0 else -1 for edge in edge1[first:end])))
+		edge2.extend(array('l', (edge + offset if edge >= 0 else -1 for edge in edge2[first:end])))
+		for state, slot in saves:
+			nfa.saves[state + offset] = slot
+		copies.append((initial + offset, accept + offset))
+
+	exit = nfa.add_state()
+	next_state = exit  # Estado al que debe enlazarse la copia procesada (de atrás hacia adelante)
+	required = repeat.min
+	if count == 0:
+		# r{0}: solo la cadena vacía, el fragmento de r queda inalcanzable
+		next_state = nfa.add_state(None, exit)
+	elif repeat.max is None:
+		copy_initial, copy_accept = copies[-1]
+		edge1[copy_accept], edge2[copy_accept] = copy_initial, exit
+		if repeat.min == 0:
+			next_state = nfa.add_state(None, copy_initial, exit)
+		else:
+			next_state = copy_initial
+			required -= 1
+	else:
+		for copy_initial, copy_accept in reversed(copies[required:]):
+			edge1[copy_accept] = next_state
+			next_state = nfa.add_state(None, copy_initial, exit)
+
+	for copy_initial, copy_accept in reversed(copies[:required]):
+		edge1[copy_accept] = next_state
+		next_state = copy_initial
+
+	return first, next_state, exit
+
+# Convierte un NFA basado en objetos State a su forma compacta.
+def to_compact(nfa):
+	compact = CompactNFA()
+	state_ids = {}
+	pending = [nfa.initial]
+	order = []
+
+	# Numera los estados alcanzables de forma iterativa
+	while pending:
+		state = pending.pop()
+		if state is None or state in state_ids:
+			continue
+		state_ids[state] = len(order)
+		order.append(state)
+		pending.append(state.edge2)
+		pending.append(state.edge1)
+
+	for state in order:
+		compact.add_state(
+			state.label,
+			state_ids[state.edge1] if state.edge1 is not None else -1,
+			state_ids[state.edge2] if state.edge2 is not None else -1,
+		)
+	compact.initial = state_ids[nfa.initial]
+	compact.accept = state_ids.get(nfa.accept, -1)
+	return compact
+
 # La función followes obtiene el conjunto de todos los estados alcanzables desde un estado dado, incluido él mismo.
-def followes(state):
-	states = set()  # Inicializa un conjunto vacío para almacenar los estados.
-	states.add(state)  # Agrega el estado actual al conjunto.
+# Si se pasa un CompactNFA en 'nfa', el estado es un índice dentro de sus arreglos.
+# El recorrido es iterativo para no depender del límite de recursión en cadenas de Thompson profundas.
+def followes(state, nfa=None):
+	states = {state}  # Inicializa el conjunto con el estado actual.
+	stack = [state]  # Pila de estados por explorar.
 
-	# Si el estado no tiene etiqueta (no es un estado de aceptación), verifica sus transiciones.
-	if state.label is None:
-		if state.edge1 is not None:
-			states |= followes(state.edge1)  # Agrega los estados alcanzables a través de la primera arista.
-		if state.edge2 is not None:
-			states |= followes(state.edge2)  # Agrega los estados alcanzables a través de la segunda arista.
+	while stack:
+		current = stack.pop()
+		# Solo los estados sin etiqueta tienen transiciones epsilon
+		if nfa is not None:
+			if nfa.label[current] is not None:
+				continue
+			next_states = (nfa.edge1[current], nfa.edge2[current])
+			missing = -1
+		else:
+			if current.label is not None:
+				continue
+			next_states = (current.edge1, current.edge2)
+			missing = None
+		for next_state in next_states:
+			if next_state != missing and next_state not in states:
+				states.add(next_state)
+				stack.append(next_state)
 
 	return states  # Retorna el conjunto de estados alcanzables.
 
 
+# Simulador de Thompson con cierres epsilon precalculados.
+# Para cada estado etiquetado guarda, una sola vez, el cierre de su destino reducido a los estados
+# relevantes (etiquetados o de aceptación). El conjunto de estados activos es un conjunto disperso:
+# una lista densa más un arreglo de marcas por generación, por lo que cada carácter cuesta O(estados)
+# sin recursión ni conjuntos nuevos.
+class NFASimulator:
+	__slots__ = ('label', 'targets', 'initial_states', 'accept', 'num_states')
+
+	def __init__(self, nfa):
+		compact = nfa if isinstance(nfa, CompactNFA) else to_compact(nfa)
+		label, edge1, edge2 = compact.label, compact.edge1, compact.edge2
+		self.num_states = len(compact)
+		self.label = label
+		self.accept = compact.accept
+
+		marks = array('l', [-1]) * self.num_states
+
+		# Calcula el cierre epsilon de 'state' conservando solo los estados relevantes
+		def closure(state, generation):
+			result = []
+			stack = [state]
+			marks[state] = generation
+			while stack:
+				current = stack.pop()
+				if label[current] is not None or current == compact.accept:
+					result.append(current)
+				if label[current] is None:
+					for next_state in (edge2[current], edge1[current]):
+						if next_state >= 0 and marks[next_state] != generation:
+							marks[next_state] = generation
+							stack.append(next_state)
+			return tuple(result)
+
+		self.initial_states = closure(compact.initial, 0)
+		self.targets = [None] * self.num_states
+		for state in range(self.num_states):
+			if label[state] is not None and edge1[state] >= 0:
+				self.targets[state] = closure(edge1[state], state + 1)
+
+	# Simula el NFA sobre la cadena de entrada.
+	def match(self, string):
+		label, targets = self.label, self.targets
+		marks = array('l', [-1]) * self.num_states
+		current_states = self.initial_states
+
+		for generation, symbol in enumerate(string):
+			next_states = []
+			for state in current_states:
+				state_label = label[state]
+				if state_label == symbol or (state_label.__class__ is CharClass and symbol in state_label):
+					for target in targets[state]:
+						if marks[target] != generation:
+							marks[target] = generation
+							next_states.append(target)
+			# Si no quedan estados activos, la cadena no puede ser aceptada
+			if not next_states:
+				return False
+			current_states = next_states
+
+		return self.accept in current_states
+
+
+# Simuladores ya construidos, asociados a cada NFA mientras este siga vivo.
+simulator_cache = weakref.WeakKeyDictionary()
 
 def match(infix, string, shunting_yard, nfa):
 	# Simulador del AFN
 
-	success, postfix = shunting_yard.infix_to_postfix(infix)
-	if not success:
-		print("Error al convertir a postfix:", postfix)  # Manejo simplificado del error
+	# La validación de la expresión pasa por la caché de patrones compilados, así que la
+	# expresión solo se convierte a postfix la primera vez que se usa.
+	from pattern import compile as compile_pattern
+	try:
+		compile_pattern(infix)
+	except ValueError as e:
+		print("Error al convertir a postfix:", e)  # Manejo simplificado del error
 		return False
 
-	# El conjunto de estados actual y el siguiente conjunto de estados
-	current_states = set()
-	next_states = set()
-
-	# Agrega el estado inicial al conjunto de estados actual
-	current_states |= followes(nfa.initial)
-
-	# Recorre cada carácter de la cadena
-	for s in string:
-		# Recorre el conjunto actual de estados
-		for c in current_states:
-			# Comprueba si el estado tiene la etiqueta 's'
-			if c.label == s:
-				# Agrega a next_states todos los estados alcanzables desde c.edge1
-				next_states |= followes(c.edge1)
-		# Prepara current_states y next_states para la siguiente ronda
-		current_states, next_states = next_states, set()
-
-	# Comprueba si el estado de aceptación está en el conjunto de estados actual
-	return nfa.accept in current_states
-
-
-def visualize_nfa(initial, accept):
-	dot = Digraph()
-	dot.attr('node', shape='circle')
-
-	visited = set()  # Para mantener un registro de los estados visitados
-	state_ids = {}  # Para asignar y recordar IDs a los estados
-
-	def get_state_id(state):
-		if state not in state_ids:
-			state_ids[state] = str(len(state_ids))
-		return state_ids[state]
-
-	# Nodo inicial invisible para señalar el estado inicial del NFA
-	dot.node('start', shape="none", label="")  # Nodo 'start' sin forma ni etiqueta
-	dot.edge('start', get_state_id(initial), label="")  # Arista desde 'start' hacia el estado inicial
-
-	# Función recursiva para visitar los estados y crear nodos y aristas
-	def visit(state):
-		if state in visited:
-			return
-		visited.add(state)
-
-		# Usa 'doublecircle' para estados de aceptación, de lo contrario 'circle'
-		if state == accept:
-			dot.attr('node', shape='doublecircle')
-		else:
-			dot.attr('node', shape='circle')
-
-		# Crea un nodo para el estado actual
-		dot.node(get_state_id(state), get_state_id(state))
-
-		# Si el estado tiene una transición a otro estado (edge1)
-		if state.edge1:
-			label = state.label if state.label else 'ε'
-			dot.edge(get_state_id(state), get_state_id(state.edge1), label=label)
-			visit(state.edge1)
-		
-		# Si el estado tiene una segunda transición a otro estado (edge2)
-		if state.edge2:
-			dot.edge(get_state_id(state), get_state_id(state.edge2), label='ε')
-			visit(state.edge2)
-	
-		# Restablece el estilo de nodo a 'circle' por si se cambió a 'doublecircle'
-		dot.attr('node', shape='circle')
-
-	visit(initial)  # Comienza el recorrido desde el estado inicial
-
-	# Renderiza y muestra el gráfico
-	dot.render('afn_visualizado', view=True, cleanup=True)
+	simulator = simulator_cache.get(nfa)
+	if simulator is None:
+		simulator = simulator_cache[nfa] = NFASimulator(nfa)
+	return simulator.match(string)
+
+
+# Visualiza el NFA con Graphviz (ver visualization.py). 'nfa' es el CompactNFA cuando 'initial' y
+# 'accept' son índices. 'directory' indica dónde guardar el PDF y 'view' si se abre el visor al terminar.
+def visualize_nfa(initial, accept, nfa=None, directory=None, view=True):
+	from visualization import nfa_graph, render
+	return render(nfa_graph(nfa if nfa is not None else NFA(initial, accept)), 'afn_visualizado', directory, view)
@@ -0,0 +1,196 @@
+import codecs
+import mmap
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from compiled_dfa import CompiledDFA, compile_dfa
+from serialization import dumps_dfa, loads_dfa
+from streaming import find_live_rows
+
+# Emparejamiento paralelo de entradas enormes.
+#
+# La entrada se divide en fragmentos y cada proceso calcula, para su fragmento, la función
+# estado -> estado del DFA: a qué fila llega partiendo de cada fila viva. Componer esas funciones
+# en orden da el estado final, igual que recorrer la entrada completa de forma secuencial.
+# Todas las filas de partida avanzan juntas; las que llegan a la misma fila se unen (el DFA es
+# determinista, así que ya no vuelven a separarse) y en cuanto queda una sola el recorrido continúa
+# como una simulación normal. Las filas desde las que ya no se puede aceptar se tratan como muertas.
+
+# DFA compilado de cada proceso de trabajo, cargado una sola vez por el inicializador del pool
+worker_dfa = None
+worker_live_rows = None
+
+def init_worker(data):
+	global worker_dfa, worker_live_rows
+	worker_dfa = loads_dfa(data, verify=False)
+	worker_live_rows = find_live_rows(worker_dfa)
+
+
+# Calcula la función de transición del fragmento para las filas de partida dadas.
+# Retorna un diccionario {fila inicial: fila final}, con -1 si la fila muere en el fragmento.
+def chunk_mapping(compiled, live_rows, text, starts):
+	classes, table, classify = compiled.symbol_classes, compiled.table, compiled.classify
+	groups = {row: [row] for row in starts if row in live_rows}  # Fila actual -> filas de partida
+	mapping = {row: -1 for row in starts}
+
+	position = 0
+	while len(groups) > 1 and position < len(text):
+		symbol_class = classes.get(text[position])
+		if symbol_class is None:
+			symbol_class = classify(text[position])
+			if symbol_class is None:
+				return mapping
+		next_groups = {}
+		for row, origins in groups.items():
+			target = table[row + symbol_class]
+			if target in live_rows:
+				if target in next_groups:
+					next_groups[target].extend(origins)
+				else:
+					next_groups[target] = origins
+		groups = next_groups
+		position += 1
+
+	# Con una sola fila activa el resto del fragmento es una simulación normal
+	if len(groups) == 1:
+		(row, origins), = groups.items()
+		for symbol in text[position:]:
+			symbol_class = classes.get(symbol)
+			if symbol_class is None:
+				symbol_class = classify(symbol)
+				if symbol_class is None:
+					return mapping
+			row = table[row + symbol_class]
+			if row not in live_rows:
+				return mapping
+		groups = {row: origins}
+
+	for row, origins in groups.items():
+		for origin in origins:
+			mapping[origin] = row
+	return mapping
+
+
+def string_task(text, first):
+	starts = [worker_dfa.initial] if first else worker_live_rows
+	return chunk_mapping(worker_dfa, worker_live_rows, text, starts)
+
+def file_task(path, start, end, encoding, first):
+	with open(path, 'rb') as file:
+		with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+			text = mapped[start:end].decode(encoding)
+	return string_task(text, first)
+
+
+# Prefijos de los nombres de codificaciones de un byte por carácter (según codecs.lookup)
+SINGLE_BYTE_ENCODINGS = ('ascii', 'latin-1', 'iso8859-', 'cp125')
+
+# Divide un archivo en rangos de bytes de tamaño aproximado chunk_size. Con UTF-8 los cortes se
+# mueven hacia adelante hasta el inicio de un carácter para no partir secuencias multibyte.
+def file_ranges(path, chunk_size, encoding):
+	size = os.path.getsize(path)
+	if size == 0:
+		return []
+	name = codecs.lookup(encoding).name
+	utf8 = name == 'utf-8'
+	if not utf8 and not name.startswith(SINGLE_BYTE_ENCODINGS):
+		raise ValueError(f"La codificación {encoding!r} no puede dividirse por bytes; use UTF-8 o una codificación de un byte.")
+	ranges = []
+	with open(path, 'rb') as file:
+		with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+			start = 0
+			while start < size:
+				end = min(start + chunk_size, size)
+				while utf8 and end < size and mapped[end] & 0xC0 == 0x80:
+					end += 1
+				ranges.append((start, end))
+				start = end
+	return ranges
+
+
+# Clase ParallelMatcher: evalúa un DFA sobre entradas muy grandes repartiendo los fragmentos en
+# un pool de procesos. El pool se crea en el primer uso y se conserva mientras viva el matcher (se
+# libera con close() o al salir de un bloque 'with'); el DFA viaja a los procesos una sola vez, en el
+# formato binario de serialization. Los fragmentos se generan a medida que se envían y nunca hay más
+# de 'max_pending' en curso, así que la memoria adicional no depende del tamaño de la entrada.
+class ParallelMatcher:
+	def __init__(self, dfa, processes=None, chunk_size=1 << 22, max_pending=None):
+		self.compiled_dfa = dfa if isinstance(dfa, CompiledDFA) else compile_dfa(dfa)
+		self.processes = processes or os.cpu_count()
+		self.chunk_size = chunk_size
+		self.max_pending = max_pending or 2 * self.processes  # Fragmentos enviados sin resultado todavía
+		self.executor = None
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc_info):
+		self.close()
+
+	# Termina los procesos del pool, si se crearon.
+	def close(self):
+		if self.executor is not None:
+			self.executor.shutdown(cancel_futures=True)
+			self.executor = None
+
+	def get_executor(self):
+		if self.executor is None:
+			self.executor = ProcessPoolExecutor(self.processes, initializer=init_worker, initargs=(dumps_dfa(self.compiled_dfa),))
+		return self.executor
+
+	# Envía function(*arguments) por cada tupla de 'tasks' y genera los resultados en orden, con a lo
+	# sumo max_pending tareas en curso. Al cerrar el generador se cancelan las que no empezaron.
+	def map_bounded(self, function, tasks):
+		executor = self.get_executor()
+		pending = deque()
+		try:
+			for arguments in tasks:
+				if len(pending) >= self.max_pending:
+					yield pending.popleft().result()
+				pending.append(executor.submit(function, *arguments))
+			while pending:
+				yield pending.popleft().result()
+		finally:
+			for future in pending:
+				future.cancel()
+
+	# Compone en orden las funciones de los fragmentos a partir de la fila inicial.
+	# Si la composición muere antes del final, deja de enviar fragmentos y cancela los pendientes.
+	def compose(self, mappings):
+		row = self.compiled_dfa.initial
+		try:
+			for mapping in mappings:
+				row = mapping.get(row, -1) if row >= 0 else -1
+				if row < 0:
+					return False
+		finally:
+			mappings.close()
+		return self.compiled_dfa.is_accept(row // self.compiled_dfa.num_classes)
+
+	# Retorna True si la cadena completa es aceptada por el DFA.
+	def match(self, text):
+		if len(text) <= self.chunk_size or self.processes == 1:
+			return self.compiled_dfa.match(text)
+
+		chunk_size = self.chunk_size
+		tasks = ((text[i:i + chunk_size], i == 0) for i in range(0, len(text), chunk_size))
+		return self.compose(self.map_bounded(string_task, tasks))
+
+	# Retorna True si el contenido completo del archivo es aceptado por el DFA. Cada proceso lee
+	# su propio rango del archivo con mmap, así que la entrada nunca se copia entre procesos.
+	# La división por bytes solo es válida para UTF-8 y codificaciones de un byte por carácter.
+	def match_file(self, path, encoding='utf-8'):
+		ranges = file_ranges(path, self.chunk_size, encoding)
+		if len(ranges) <= 1 or self.processes == 1:
+			with open(path, encoding=encoding, newline='') as file:
+				return self.compiled_dfa.match(file.read())
+
+		tasks = ((path, start, end, encoding, index == 0) for index, (start, end) in enumerate(ranges))
+		return self.compose(self.map_bounded(file_task, tasks))
+
+
+# Retorna True si la cadena completa es aceptada, procesándola en paralelo.
+def match_parallel(dfa, text, processes=None, chunk_size=1 << 22):
+	with ParallelMatcher(dfa, processes, chunk_size) as matcher:
+		return matcher.match(text)
@@ -0,0 +1,142 @@
+from collections import OrderedDict
+from functools import cached_property
+
+from regex_parser import RegexParser, tree_to_postfix
+from syntax_tree import Node
+from nfa import Thompson, NFASimulator
+from dfa import minimize_dfa
+from bitset_dfa import dfa_from_nfa_bitset
+from compiled_dfa import compile_dfa
+from direct_dfa import DirectDFA
+from derivatives import DerivativeDFA, DerivativeMatcher
+from codegen import compile_matcher
+from pike_vm import PikeVM
+
+# Clase Pattern: una expresión regular compilada y reutilizable.
+# El análisis (árbol sintáctico y postfix) se hace una sola vez al crearla; el NFA, el DFA,
+# el DFA minimizado y su tabla compilada se construyen de forma perezosa la primera vez que se usan.
+class Pattern:
+	def __init__(self, infix, tree, num_groups=0):
+		self.infix = infix  # Expresión regular original.
+		self.tree = tree  # Raíz del árbol sintáctico, con los grupos de captura como nodos Group.
+		self.num_groups = num_groups  # Cantidad de grupos de captura.
+		self.postfix = tree_to_postfix(tree, groups=False)  # Expresión en formato postfix, sin grupos.
+
+	def __repr__(self):
+		return f"Pattern({self.infix!r})"
+
+	@cached_property
+	def nfa(self):
+		return Thompson(self.postfix)
+
+	@cached_property
+	def compact_nfa(self):
+		return Thompson(self.postfix, compact=True)
+
+	@cached_property
+	def nfa_simulator(self):
+		return NFASimulator(self.compact_nfa)
+
+	@cached_property
+	def dfa(self):
+		return dfa_from_nfa_bitset(self.compact_nfa)
+
+	@cached_property
+	def minimized_dfa(self):
+		return minimize_dfa(self.dfa)
+
+	@cached_property
+	def direct_dfa(self):
+		# La construcción directa necesita el símbolo de fin '#' concatenado al final de la expresión
+		root = Node('.')
+		root.children.extend((self.tree, Node('#')))
+		direct_dfa = DirectDFA(root)
+		direct_dfa.build()
+		return direct_dfa.dfa
+
+	@cached_property
+	def derivative_dfa(self):
+		derivative_dfa = DerivativeDFA(self.tree)
+		derivative_dfa.build()
+		return derivative_dfa.dfa
+
+	@cached_property
+	def derivative_matcher(self):
+		# Emparejamiento perezoso por derivadas: solo construye los estados que visita la entrada
+		return DerivativeMatcher(self.tree)
+
+	@cached_property
+	def compiled_dfa(self):
+		return compile_dfa(self.minimized_dfa)
+
+	@cached_property
+	def matcher(self):
+		# Función generada para el DFA minimizado, para patrones muy usados
+		return compile_matcher(self.compiled_dfa)
+
+	@cached_property
+	def pike_vm(self):
+		# Máquina de Pike sobre un NFA con los grupos de captura, a partir del mismo árbol
+		return PikeVM(Thompson(tree_to_postfix(self.tree), compact=True), self.num_groups)
+
+	# Retorna True si la cadena completa coincide con la expresión (usa la tabla del DFA minimizado).
+	def match(self, string):
+		return self.compiled_dfa.match(string)
+
+	# Retorna el Match (con los grupos de captura) si la cadena completa coincide, o None.
+	def fullmatch(self, string):
+		return self.pike_vm.fullmatch(string)
+
+	# Retorna el Match de la primera coincidencia (leftmost-first) desde 'start', o None.
+	def search(self, string, start=0):
+		return self.pike_vm.search(string, start)
+
+
+# Caché LRU acotada de patrones compilados, indexada por la expresión infix.
+class PatternCache:
+	def __init__(self, maxsize=512):
+		self.maxsize = maxsize  # Cantidad máxima de patrones en caché.
+		self.patterns = OrderedDict()
+		self.hits = 0
+		self.misses = 0
+
+	# Retorna el patrón compilado para 'infix', compilándolo si no está en caché.
+	# Lanza RegexSyntaxError (un ValueError) si la expresión no es válida.
+	def get(self, infix):
+		pattern = self.patterns.get(infix)
+		if pattern is not None:
+			self.hits += 1
+			self.patterns.move_to_end(infix)
+			return pattern
+
+		self.misses += 1
+		parser = RegexParser(captures=True)
+		pattern = Pattern(infix, parser.parse(infix), parser.num_groups)
+		self.patterns[infix] = pattern
+		# Descarta el patrón usado hace más tiempo si se supera el límite
+		while len(self.patterns) > self.maxsize:
+			self.patterns.popitem(last=False)
+		return pattern
+
+	# Retorna las estadísticas de la caché.
+	def info(self):
+		return {'hits': self.hits, 'misses': self.misses, 'size': len(self.patterns), 'maxsize': self.maxsize}
+
+	def clear(self):
+		self.patterns.clear()
+		self.hits = 0
+		self.misses = 0
+
+
+# Caché compartida por compile()
+pattern_cache = PatternCache()
+
+# Compila una expresión regular infix y retorna un Pattern reutilizable desde la caché compartida.
+def compile(infix):
+	return pattern_cache.get(infix)
+
+def cache_info():
+	return pattern_cache.info()
+
+def purge():
+	pattern_cache.clear()
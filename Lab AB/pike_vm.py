@@ -0,0 +1,171 @@
+from array import array
+
+from char_class import CharClass
+from nfa import CompactNFA, Thompson, to_compact
+from regex_parser import RegexParser, tree_to_postfix
+
+# Extracción de subcoincidencias (grupos de captura) con una máquina de Pike sobre el NFA de Thompson.
+#
+# Se simulan todos los hilos del NFA a la vez, como en NFASimulator, pero cada hilo lleva sus
+# ranuras de captura (una tupla con el inicio y el fin de cada grupo). Los hilos se mantienen en
+# orden de prioridad: el cierre epsilon se recorre en profundidad siguiendo primero edge1, que en la
+# construcción de Thompson es la rama izquierda de '|' y la rama que repite en '*', '+', '?' y {m,n}.
+# Cuando dos hilos llegan al mismo estado solo sobrevive el de mayor prioridad, así que el resultado
+# es el de un motor con backtracking (leftmost-first), pero cada estado se visita a lo sumo una vez
+# por carácter: el tiempo es O(n·m) y nunca hay backtracking catastrófico.
+#
+# El grupo 0 es la coincidencia completa; los grupos 1..n son los de la expresión, numerados en el
+# orden de sus '('. Un grupo que no participó en la coincidencia tiene el intervalo None.
+
+
+# Clase Match: resultado de una coincidencia con sus grupos de captura.
+class Match:
+	__slots__ = ('string', 'slots')
+
+	def __init__(self, string, slots):
+		self.string = string
+		self.slots = slots  # Inicio y fin de cada grupo: (inicio0, fin0, inicio1, fin1, ...), -1 si no participó
+
+	def __repr__(self):
+		return f"Match(span={self.span()}, match={self.group()!r})"
+
+	# Retorna el intervalo (inicio, fin) del grupo, o None si no participó en la coincidencia.
+	def span(self, index=0):
+		if not 0 <= index < len(self.slots) // 2:
+			raise IndexError(f"No existe el grupo {index}.")
+		start, end = self.slots[2 * index], self.slots[2 * index + 1]
+		if start < 0 or end < 0:
+			return None
+		return start, end
+
+	# Retorna el texto del grupo, o None si no participó en la coincidencia.
+	def group(self, index=0):
+		span = self.span(index)
+		return self.string[span[0]:span[1]] if span is not None else None
+
+	# Retorna los textos de los grupos 1..n.
+	def groups(self):
+		return tuple(self.group(index) for index in range(1, len(self.slots) // 2))
+
+	def spans(self):
+		return tuple(self.span(index) for index in range(len(self.slots) // 2))
+
+	@property
+	def start(self):
+		return self.slots[0]
+
+	@property
+	def end(self):
+		return self.slots[1]
+
+
+# Clase PikeVM: ejecuta un CompactNFA con estados de captura (ver thompson_compact).
+# 'num_groups' es la cantidad de grupos de la expresión; si se omite se deduce de los estados de captura.
+class PikeVM:
+	__slots__ = ('nfa', 'num_groups', 'num_slots')
+
+	def __init__(self, nfa, num_groups=None):
+		self.nfa = nfa if isinstance(nfa, CompactNFA) else to_compact(nfa)
+		if num_groups is None:
+			num_groups = max(self.nfa.saves.values(), default=1) // 2
+		self.num_groups = num_groups
+		self.num_slots = 2 * (num_groups + 1)
+
+	# Agrega a 'threads' los hilos del cierre epsilon de 'state', en orden de prioridad. Los estados de
+	# captura copian las ranuras con la posición actual; solo los estados etiquetados y el de aceptación
+	# quedan como hilos. 'marks' evita visitar dos veces un estado en la misma generación.
+	def add_thread(self, threads, marks, generation, state, slots, position):
+		nfa = self.nfa
+		label, edge1, edge2, saves, accept = nfa.label, nfa.edge1, nfa.edge2, nfa.saves, nfa.accept
+		stack = [(state, slots)]
+		while stack:
+			state, slots = stack.pop()
+			if marks[state] == generation:
+				continue
+			marks[state] = generation
+
+			slot = saves.get(state)
+			if slot is not None:
+				slots = slots[:slot] + (position,) + slots[slot + 1:]
+			if label[state] is not None:
+				if edge1[state] >= 0:
+					threads.append((state, slots))
+				continue
+			if state == accept:
+				threads.append((state, slots))
+			# edge2 se apila primero para que edge1, la de mayor prioridad, se recorra antes
+			if edge2[state] >= 0:
+				stack.append((edge2[state], slots))
+			if edge1[state] >= 0:
+				stack.append((edge1[state], slots))
+
+	# Ejecuta la máquina desde 'start'. Con 'anchored' la coincidencia debe empezar en 'start' y
+	# terminar al final de la cadena; si no, se busca la primera coincidencia (leftmost-first).
+	# Retorna las ranuras de la coincidencia, o None si no hay.
+	def run(self, string, start, anchored):
+		nfa = self.nfa
+		if nfa.initial < 0:
+			return None
+		label, edge1, accept = nfa.label, nfa.edge1, nfa.accept
+		marks = array('l', [-1]) * len(nfa)
+		empty_slots = (-1,) * self.num_slots
+		length = len(string)
+
+		matched = None
+		threads = []
+		self.add_thread(threads, marks, start, nfa.initial, (start,) + empty_slots[1:], start)
+		position = start
+		while threads:
+			char = string[position] if position < length else None
+			next_threads = []
+			for state, slots in threads:
+				if state == accept:
+					if anchored and position < length:
+						continue
+					# Los hilos siguientes tienen menor prioridad que esta coincidencia y se descartan
+					matched = slots[:1] + (position,) + slots[2:]
+					break
+				if char is None:
+					continue
+				state_label = label[state]
+				if state_label == char or (state_label.__class__ is CharClass and char in state_label):
+					self.add_thread(next_threads, marks, position + 1, edge1[state], slots, position + 1)
+
+			if position >= length:
+				break
+			position += 1
+			# Sin coincidencia todavía, cada posición puede iniciar un hilo de menor prioridad
+			if not anchored and matched is None:
+				self.add_thread(next_threads, marks, position, nfa.initial, (position,) + empty_slots[1:], position)
+			threads = next_threads
+
+		return matched
+
+	# Retorna el Match si la cadena completa coincide con la expresión, o None.
+	def fullmatch(self, string):
+		slots = self.run(string, 0, True)
+		return Match(string, slots) if slots is not None else None
+
+	# Retorna el Match de la primera coincidencia desde 'start' (la que empieza más a la izquierda y,
+	# entre esas, la de mayor prioridad), o None.
+	def search(self, string, start=0):
+		slots = self.run(string, start, False)
+		return Match(string, slots) if slots is not None else None
+
+	# Genera las coincidencias sin solapamiento de izquierda a derecha.
+	def finditer(self, string):
+		position = 0
+		while position <= len(string):
+			match = self.search(string, position)
+			if match is None:
+				return
+			yield match
+			# Tras una coincidencia vacía se avanza un carácter para no repetirla
+			position = match.end if match.end > match.start else match.end + 1
+
+
+# Compila una expresión infix con grupos de captura y retorna su PikeVM.
+def compile_captures(infix):
+	parser = RegexParser(captures=True)
+	tree = parser.parse(infix)
+	return PikeVM(Thompson(tree_to_postfix(tree), compact=True), parser.num_groups)
@@ -1,3 +1,7 @@
+from syntax_tree import Node, Repeat, Group
+from char_class import CharClass, ESCAPE_CLASSES, ESCAPE_CHARS
+from instrumentation import timed
+
 # Define la clase Shunting Yard para la conversion de una expresion regular infix a postfix
 
 class ShuntingYard:
@@ -21,169 +25,296 @@ class ShuntingYard:
 		}
 		return precedence.get(c, 0)
 
-	# Valida que la expresion este balanceada 
-	def validate_parentheses(self, regex):
-		stack = []
-		for char in regex:
-			if char == '(':
-				stack.append(char)
-			elif char == ')':
-				if not stack or stack[-1] != '(':
-					return False
-				stack.pop()
-		return not stack
-
-	# Valida que la sintaxis de la expresion este correcta
-	def validate_operators(self, regex):
-		for i, char in enumerate(regex):
-			# Validación para operadores unarios
-			if char in self.unary_operators:
-				if i == 0 or (regex[i - 1] in self.all_operators + ['(']):
-					raise ValueError(f"Operador unario '{char}' no tiene operando a la izquierda en la posición {i}.")
-
-			# Validación para operadores binarios
-			if char in self.binary_operators:
-				if i == 0 or i == len(regex) - 1:
-					raise ValueError(f"Operador binario '{char}' no tiene operandos en la posición {i}.")
-
-				# Verificar si a la izquierda del operador binario hay un operador unario o un paréntesis abierto sin un operando adecuado antes
-				left_invalid = i - 1 == 0 and regex[i - 1] in ['('] or \
-							   (i - 2 >= 0 and regex[i - 1] in self.unary_operators and (regex[i - 2] in self.all_operators + ['(']))
-				right_invalid = i + 1 == len(regex) - 1 and regex[i + 1] in [')'] or \
-								(i + 2 < len(regex) and regex[i + 1] in self.unary_operators and (regex[i + 2] in self.all_operators + [')']))
-
-				if left_invalid or right_invalid:
-					raise ValueError(f"Operador binario '{char}' usado incorrectamente en la posición {i}.")
-
-
-	# Valida la expresion
+	# Valida la expresion; lanza RegexSyntaxError (un ValueError) si no es valida
 	def validate_expression(self, regex):
-		if not self.validate_parentheses(regex):
-			raise ValueError("La expresión regular tiene paréntesis no balanceados.")
-		self.validate_operators(regex)
+		RegexParser().parse(regex)
 
-	# Convierte el operador '+' a su forma explicita, es decir, 'a+' pasa a ser 'aa*'
-	def plus_operator_conversion(self, regex):
-
-		i = 0
-		transformed_exp = ""
-
-		# Bucle que recorre la expresion regular
-		while i < len(regex):
-
-			# Si encuentra un '+' verifica el caracter anterior
-			if regex[i] == '+':
-				# si es un parentesis, busca el parentesis correspondiente y reemplaza por '*'
-				if regex[i-1] == ')':
-					for j in range(i-1, -1, -1):
-						if regex[j] == '(':
-							transformed_exp += regex[j:i] + "*"
-						  
-				else:
-					transformed_exp += regex[i-1] + '*'
-			else:
-				transformed_exp += regex[i]
-			i += 1
-		return transformed_exp
+	# Convierte la expresion infix a formato postfix. El analisis se hace en una sola pasada con
+	# RegexParser, que construye el arbol sintactico; el postfix se obtiene recorriendo ese arbol.
+	# Con captures=True el postfix incluye un token Group por cada grupo de captura.
+	def infix_to_postfix(self, regex, captures=False):
+		try:
+			root = RegexParser(captures).parse(regex)
+		except ValueError as e:
+			return False, str(e)
 
+		return True, tree_to_postfix(root)
 
-	# Convierte la extension de expresion '?' a su forma explicita, es decir, 'a?' a 'a|ε'
-	def interrogation_operator_conversion(self, regex):
-		
-		stack = []
-		openParentesis = []
-		i = 0
 
-		# Bucle que recorre la expresion regular
-		while i < len(regex):
-			# Si encuentra '?', verifica el caracter anterior
-			if regex[i] == '?':
-				# si es un parentesis, busca el parentesis correspondiente 
-				if regex[i-1] == ')':
-					for j in range(i-1, -1, -1):
-						if regex[j] == ')':
-							stack.append(regex[j])
-						elif regex[j] == '(':
-							stack.pop()
-							if not stack:
-								openParentesis.append(j + 1)
-								break
-				else:
-					openParentesis.append(i - 1)
-			i += 1
+# Error de sintaxis en una expresion regular; 'position' apunta al caracter de la expresion original.
+class RegexSyntaxError(ValueError):
+	def __init__(self, message, position):
+		super().__init__(f"{message} en la posición {position}.")
+		self.position = position
 
-		transformed_exp = ""
-		i = 0
 
-		while i < len(regex):
-			if i in openParentesis:
-				count = openParentesis.count(i)
-				transformed_exp += '(' * count + regex[i]
+# Contexto de un grupo abierto mientras se analiza la expresion
+class GroupFrame:
+	def __init__(self, position, index=None):
+		self.position = position  # Posicion del '(' que abrio el grupo (-1 para la expresion completa)
+		self.index = index  # Numero del grupo de captura, o None si el grupo no captura
+		self.branches = []  # Alternativas ya terminadas (separadas por '|')
+		self.sequence = []  # Elementos de la concatenacion actual
 
-			elif regex[i] == '?':
-				transformed_exp += '|ε)' #  reemplaza por '|ε'
 
-			else:
-				transformed_exp += regex[i]
+# Analizador de una sola pasada: valida la expresion y construye el arbol sintactico directamente,
+# en tiempo lineal. Usa una pila explicita de grupos en lugar de recursion, por lo que el
+# anidamiento profundo no depende del limite de recursion de Python.
+# Precedencia: '|' < concatenacion (implicita o con '.') < operadores unarios '*', '+', '?'.
+# Con captures=True cada '(' abre un grupo de captura, numerado desde 1 en el orden de los '(',
+# que queda en el arbol como un nodo Group; '(?:' abre un grupo que no captura.
+class RegexParser:
+	unary_operators = '*+?'
 
-			i += 1
+	def __init__(self, captures=False):
+		self.captures = captures
+		self.num_groups = 0  # Grupos de captura de la ultima expresion analizada
 
-		return transformed_exp
+	@timed('parse')
+	def parse(self, regex):
+		if not regex:
+			raise RegexSyntaxError("La expresión regular está vacía", 0)
+		self.num_groups = 0
 
+		frames = [GroupFrame(-1)]
+		previous = None  # Tipo del token anterior: 'operand', 'unary', 'open', '|' o '.'
 
-	# Maneja la concatenacion implicita, transformandola en explicita usando .
-	def concatenation_conversion(self, expression):
-	   
-		new_expression = []
+		i = 0
+		while i < len(regex):
+			char = regex[i]
+			frame = frames[-1]
 
-		# Bucle que recorre la expresion
-		for i in range(len(expression) - 1):
-			new_expression.append(expression[i])
+			if char == '(':
+				# '(?:' agrupa sin capturar
+				if regex.startswith('?:', i + 1):
+					frames.append(GroupFrame(i))
+					i += 2
+				elif self.captures:
+					self.num_groups += 1
+					frames.append(GroupFrame(i, self.num_groups))
+				else:
+					frames.append(GroupFrame(i))
+				previous = 'open'
 
-			# si encuentra caracteres consecutivos que no sean operadores, agrega '.' entre caracteres
-			if (expression[i] not in ['|', '(', '.'] and 
-				expression[i+1] not in ['|', ')', '*', '+', '?']
-				):
-				new_expression.append('.')
+			elif char == ')':
+				if len(frames) == 1:
+					raise RegexSyntaxError("Paréntesis de cierre sin apertura", i)
+				if previous == 'open':
+					raise RegexSyntaxError("Paréntesis vacíos", i)
+				if previous in ('|', '.'):
+					raise RegexSyntaxError(f"Operador binario '{regex[i - 1]}' no tiene operando a la derecha", i - 1)
+				frames.pop()
+				node = self.finish_group(frame)
+				if frame.index is not None:
+					group = Node(Group(frame.index))
+					group.children.append(node)
+					node = group
+				frames[-1].sequence.append(node)
+				previous = 'operand'
+
+			elif char == '|':
+				if previous in (None, 'open', '|', '.'):
+					raise RegexSyntaxError("Operador binario '|' no tiene operando a la izquierda", i)
+				frame.branches.append(self.concatenate(frame.sequence))
+				frame.sequence = []
+				previous = '|'
+
+			elif char == '.':
+				if previous in (None, 'open', '|', '.'):
+					raise RegexSyntaxError("Operador binario '.' no tiene operando a la izquierda", i)
+				previous = '.'
+
+			elif char in self.unary_operators:
+				if previous not in ('operand',):
+					raise RegexSyntaxError(f"Operador unario '{char}' no tiene operando a la izquierda", i)
+				operand = frame.sequence.pop()
+				node = Node(char)
+				node.children.append(operand)
+				frame.sequence.append(node)
+				previous = 'unary'
+
+			elif char == '[':
+				token, i = self.parse_class(regex, i)
+				frame.sequence.append(Node(token))
+				previous = 'operand'
+				continue
+
+			elif char == '\\':
+				token, i = self.parse_escape(regex, i)
+				frame.sequence.append(Node(token))
+				previous = 'operand'
+				continue
+
+			elif char == '{':
+				if previous not in ('operand',):
+					raise RegexSyntaxError("Repetición '{' no tiene operando a la izquierda", i)
+				repeat, next_i = self.parse_repeat(regex, i)
+				node = Node(repeat)
+				node.children.append(frame.sequence.pop())
+				frame.sequence.append(node)
+				previous = 'unary'
+				i = next_i
+				continue
+
+			elif char == ']':
+				raise RegexSyntaxError("Corchete de cierre sin apertura", i)
+
+			elif char == '}':
+				raise RegexSyntaxError("Llave de cierre sin apertura", i)
 
-		new_expression.append(expression[-1])
+			else:
+				frame.sequence.append(Node(char))
+				previous = 'operand'
 
-		return ''.join(new_expression)
+			i += 1
 
-	# Hace uso de las conversiones para transformar la expresion a su forma explicita 
-	# antes de hacer shunting yard
-	def format_regex(self, regex):
-		regex = self.plus_operator_conversion(regex)
-		regex = self.interrogation_operator_conversion(regex)
-		regex = self.concatenation_conversion(regex)
-		return regex
+		if len(frames) > 1:
+			raise RegexSyntaxError("Paréntesis sin cerrar", frames[-1].position)
+		if previous in ('|', '.'):
+			raise RegexSyntaxError(f"Operador binario '{regex[-1]}' no tiene operando a la derecha", len(regex) - 1)
+
+		return self.finish_group(frames[0])
+
+	# Analiza un escape que inicia en regex[i] ('\\'). Retorna el token (una clase predefinida como \d
+	# o un carácter literal) y la posición siguiente al escape.
+	def parse_escape(self, regex, i):
+		char = self.escaped_char(regex, i)
+		if char is None:
+			return ESCAPE_CLASSES[regex[i + 1]], i + 2
+		return literal_token(char), i + 2
+
+	# Retorna el carácter literal de un escape en regex[i], o None si es una clase predefinida.
+	def escaped_char(self, regex, i):
+		if i + 1 >= len(regex):
+			raise RegexSyntaxError("Escape incompleto al final de la expresión", i)
+		char = regex[i + 1]
+		if char in ESCAPE_CLASSES:
+			return None
+		return ESCAPE_CHARS.get(char, char)
+
+	# Analiza una clase [...] que inicia en regex[i]. Admite rangos 'a-z', negación con '^' al inicio,
+	# escapes (incluidos \d, \w y \s) y ']' como primer carácter literal.
+	# Retorna el token de la clase (un carácter si la clase tiene uno solo) y la posición siguiente a ']'.
+	def parse_class(self, regex, i):
+		start = i
+		i += 1
+		negated = i < len(regex) and regex[i] == '^'
+		if negated:
+			i += 1
 
-	# Convierte la expresion infix a formato postfix utilizando el algoritmo de Shunting Yard
-	def infix_to_postfix(self, regex):
-		try:
-			self.validate_expression(regex)
-		except ValueError as e:
-			return False, str(e)
-		
-		postfix = []
-		stack = []
-		formatted_regex = self.format_regex(regex)
-
-		for c in formatted_regex:
-			if c == '(':
-				stack.append(c)
-			elif c == ')':
-				while stack and stack[-1] != '(':
-					postfix.append(stack.pop())
-				stack.pop()
-			elif c in self.all_operators:
-				while stack and self.get_precedence(stack[-1]) >= self.get_precedence(c):
-					postfix.append(stack.pop())
-				stack.append(c)
+		intervals = []
+		first = True
+		while True:
+			if i >= len(regex):
+				raise RegexSyntaxError("Clase de caracteres sin cerrar", start)
+			item_position = i
+			low = regex[i]
+			if low == ']' and not first:
+				i += 1
+				break
+			first = False
+
+			if low == '\\':
+				low = self.escaped_char(regex, i)
+				if low is None:
+					intervals.extend(ESCAPE_CLASSES[regex[i + 1]].intervals)
+					i += 2
+					continue
+			i += 2 if regex[item_position] == '\\' else 1
+
+			# Rango 'a-z' (un '-' antes de ']' es literal)
+			if i + 1 < len(regex) and regex[i] == '-' and regex[i + 1] != ']':
+				high = regex[i + 1]
+				if high == '\\':
+					high = self.escaped_char(regex, i + 1)
+				i += 3 if regex[i + 1] == '\\' else 2
+				if high is None or ord(low) > ord(high):
+					raise RegexSyntaxError(f"Rango inválido '{regex[item_position:i]}'", item_position)
+				intervals.append((ord(low), ord(high)))
 			else:
-				postfix.append(c)
-
-		while stack:
-			postfix.append(stack.pop())
-
-		return True, ''.join(postfix)
+				intervals.append((ord(low), ord(low)))
+
+		char_class = CharClass(intervals)
+		if negated:
+			char_class = char_class.negate()
+		if not char_class.intervals:
+			raise RegexSyntaxError("Clase de caracteres vacía", start)
+		if len(char_class) == 1:
+			return literal_token(char_class.representative()), i
+		return char_class, i
+
+	# Analiza una repetición {m}, {m,} o {m,n} que inicia en regex[i].
+	# Retorna el Repeat correspondiente y la posición siguiente a '}'.
+	def parse_repeat(self, regex, i):
+		end = regex.find('}', i)
+		if end < 0:
+			raise RegexSyntaxError("Repetición sin cerrar", i)
+		bounds = regex[i + 1:end].split(',')
+		if len(bounds) > 2 or not bounds[0] or not all(bound.isascii() and bound.isdigit() for bound in bounds if bound):
+			raise RegexSyntaxError(f"Repetición inválida '{regex[i:end + 1]}'", i)
+
+		low = int(bounds[0])
+		if len(bounds) == 1:
+			high = low
+		else:
+			high = int(bounds[1]) if bounds[1] else None
+		if high is not None and low > high:
+			raise RegexSyntaxError(f"Repetición inválida '{regex[i:end + 1]}': el mínimo es mayor que el máximo", i)
+		if max(low, high or 0) > MAX_REPEAT:
+			raise RegexSyntaxError(f"Repetición '{regex[i:end + 1]}' excede el máximo de {MAX_REPEAT}", i)
+		return Repeat(low, high), end + 1
+
+	# Une los elementos de una secuencia con concatenaciones asociativas a la izquierda
+	def concatenate(self, sequence):
+		node = sequence[0]
+		for item in sequence[1:]:
+			parent = Node('.')
+			parent.children.extend((node, item))
+			node = parent
+		return node
+
+	# Cierra un grupo: une sus alternativas con '|' asociativo a la izquierda
+	def finish_group(self, frame):
+		node = None
+		for branch in frame.branches + [self.concatenate(frame.sequence)]:
+			if node is None:
+				node = branch
+			else:
+				parent = Node('|')
+				parent.children.extend((node, branch))
+				node = parent
+		return node
+
+
+# Convierte un arbol sintactico a su expresion postfix con un recorrido post-orden iterativo.
+# Con groups=False se omiten los tokens Group, para las construcciones que no extraen capturas.
+def tree_to_postfix(root, groups=True):
+	postfix = []
+	stack = [(root, False)]
+	while stack:
+		node, children_done = stack.pop()
+		if children_done or not node.children:
+			if groups or not isinstance(node.value, Group):
+				postfix.append(node.value)
+		else:
+			stack.append((node, True))
+			for child in reversed(node.children):
+				stack.append((child, False))
+	# Con clases de caracteres el postfix es una lista de tokens; si solo hay caracteres, una cadena
+	if all(isinstance(token, str) for token in postfix):
+		return ''.join(postfix)
+	return postfix
+
+
+# Token de un carácter literal: los que coinciden con un operador o con 'ε' se representan
+# como una clase de un solo carácter.
+def literal_token(char):
+	if char in OPERATOR_CHARS:
+		return CharClass.single(char)
+	return char
+
+
+OPERATOR_CHARS = frozenset('()|.*+?ε')
+
+# Conteo máximo permitido en una repetición {m,n}
+MAX_REPEAT = 10000
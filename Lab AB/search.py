@@ -0,0 +1,129 @@
+import codecs
+import mmap
+import os
+from collections import deque
+from itertools import chain
+
+from compiled_dfa import CompiledDFA, compile_dfa
+
+# Clase Searcher: búsqueda no anclada (leftmost-longest) de todas las coincidencias de un DFA.
+#
+# Cada posición de la entrada puede iniciar un hilo que avanza por la tabla compilada del DFA.
+# Los hilos que llegan a la misma fila se unen conservando el inicio más temprano, por lo que el
+# trabajo por carácter está acotado por la cantidad de estados del DFA. Cuando algún hilo acepta
+# ya no se abren hilos nuevos y se descartan los que empezaron después de la mejor coincidencia;
+# cuando no quedan hilos vivos, la mejor coincidencia (inicio más a la izquierda y, para ese inicio,
+# fin más largo) se reporta y la búsqueda se reanuda desde su fin.
+#
+# La entrada se procesa por fragmentos: el estado de los hilos se conserva entre fragmentos y solo
+# se retiene el texto que todavía podría volver a examinarse.
+class Searcher:
+	def __init__(self, dfa):
+		self.compiled_dfa = dfa if isinstance(dfa, CompiledDFA) else compile_dfa(dfa)
+		num_classes = self.compiled_dfa.num_classes
+		# Filas (desplazamientos en la tabla) de los estados de aceptación
+		self.accept_rows = {
+			state * num_classes
+			for state in range(self.compiled_dfa.num_states)
+			if self.compiled_dfa.is_accept(state)
+		}
+
+	# Genera las coincidencias (inicio, fin) de una cadena completa.
+	def finditer(self, string):
+		return self.finditer_chunks([string])
+
+	# Genera las coincidencias (inicio, fin) sobre un iterable de fragmentos de texto.
+	# Las posiciones son absolutas respecto al inicio del primer fragmento.
+	def finditer_chunks(self, chunks):
+		compiled = self.compiled_dfa
+		classes, table, initial = compiled.symbol_classes, compiled.table, compiled.initial
+		accept_rows = self.accept_rows
+
+		pieces = deque()  # Fragmentos pendientes como (posición absoluta de inicio, texto), sin concatenar
+		end = 0  # Posición absoluta siguiente al último fragmento recibido
+		text, text_start = '', 0  # Fragmento que contiene la posición actual
+		position = 0  # Siguiente posición a procesar
+		next_start = 0  # Primera posición en la que se permite iniciar una coincidencia
+		threads = {}  # Fila del DFA -> inicio más temprano de los hilos en esa fila
+		best = None  # Mejor coincidencia (inicio, fin) encontrada hasta ahora
+
+		for chunk in chain(chunks, [None]):
+			final = chunk is None
+			if not final and chunk:
+				pieces.append((end, chunk))
+				end += len(chunk)
+
+			while position < end or (final and position == end):
+				# Abre un hilo nuevo en esta posición si todavía no hay coincidencia
+				if best is None and position >= next_start and initial >= 0 and initial not in threads:
+					threads[initial] = position
+					if initial in accept_rows:
+						best = (position, position)
+
+				if position == end:
+					# Fin de la entrada: ningún hilo puede seguir avanzando
+					threads = {}
+				else:
+					if not text_start <= position < text_start + len(text):
+						text_start, text = next(piece for piece in pieces if piece[0] + len(piece[1]) > position)
+					char = text[position - text_start]
+					symbol_class = classes.get(char)
+					if symbol_class is None:
+						symbol_class = compiled.classify(char)
+					next_threads = {}
+					if symbol_class is not None:
+						for row, start in threads.items():
+							target = table[row + symbol_class]
+							if target >= 0 and next_threads.get(target, start + 1) > start:
+								next_threads[target] = start
+						for row, start in next_threads.items():
+							if row in accept_rows and (best is None or start <= best[0]):
+								best = (start, position + 1)
+					threads = next_threads
+				position += 1
+
+				if best is not None:
+					# Los hilos que empezaron después de la mejor coincidencia ya no pueden mejorarla
+					threads = {row: start for row, start in threads.items() if start <= best[0]}
+					if not threads:
+						yield best
+						start, match_end = best
+						best = None
+						next_start = position = match_end if match_end > start else match_end + 1
+
+			if final:
+				break
+
+			# Conserva solo los fragmentos que aún pueden volver a examinarse: tras una coincidencia la
+			# búsqueda se reanuda desde su fin, así que nunca se retrocede antes de min(position, best[1])
+			keep = min(position, best[1]) if best else position
+			while pieces and pieces[0][0] + len(pieces[0][1]) <= keep:
+				pieces.popleft()
+
+	# Genera las coincidencias (inicio, fin) de un archivo, leyéndolo por fragmentos.
+	# Las posiciones se cuentan en caracteres del texto decodificado.
+	def finditer_file(self, path, chunk_size=1 << 20, encoding='utf-8', use_mmap=True):
+		return self.finditer_chunks(read_chunks(path, chunk_size, encoding, use_mmap))
+
+
+# Lee un archivo por fragmentos decodificados, usando mmap si es posible para no copiarlo a memoria.
+def read_chunks(path, chunk_size=1 << 20, encoding='utf-8', use_mmap=True):
+	decoder = codecs.getincrementaldecoder(encoding)()
+	with open(path, 'rb') as file:
+		size = os.fstat(file.fileno()).st_size
+		if use_mmap and size > 0:
+			with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+				for offset in range(0, size, chunk_size):
+					yield decoder.decode(mapped[offset:offset + chunk_size])
+		else:
+			while True:
+				data = file.read(chunk_size)
+				if not data:
+					break
+				yield decoder.decode(data)
+	yield decoder.decode(b'', final=True)
+
+
+# Genera las coincidencias (inicio, fin) de un DFA dentro de una cadena.
+def finditer(dfa, string):
+	return Searcher(dfa).finditer(string)
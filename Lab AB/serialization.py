@@ -0,0 +1,117 @@
+import mmap
+import os
+import struct
+import sys
+import zlib
+from array import array
+
+from compiled_dfa import CompiledDFA, compile_dfa
+
+# Formato binario versionado para DFA compilados.
+#
+# Todos los enteros son little-endian y cada sección empieza alineada a 8 bytes, de modo que el
+# archivo puede abrirse con mmap y la tabla de transiciones se usa directamente desde la memoria
+# compartida, sin copiarla ni reconstruir el DFA:
+#
+#   cabecera (32 bytes)  magic 'LABDFA\0\0', versión u16, flags u16, estados u32, clases u32,
+#                        fila inicial i32, intervalos u32, crc32 u32 del resto del archivo
+#   tabla                estados * clases enteros i32: desplazamiento de la fila destino o -1
+#   aceptación           mapa de bits de ceil(estados / 8) bytes: bit i = estado i acepta
+#   alfabeto             intervalos * (inicio u32, fin u32, clase u32), ordenados por inicio
+#
+# Los nombres originales de los estados no se guardan: al cargar, los estados son 0..n-1.
+MAGIC = b'LABDFA\0\0'
+VERSION = 1
+HEADER = struct.Struct('<8sHHIIiII')
+INTERVAL = struct.Struct('<III')
+
+
+def align(offset):
+	return (offset + 7) & ~7
+
+
+# Calcula el tamaño y el desplazamiento de cada sección a partir de los datos de la cabecera.
+def section_offsets(num_states, num_classes, num_intervals):
+	table_offset = HEADER.size
+	accept_offset = align(table_offset + 4 * num_states * num_classes)
+	alphabet_offset = align(accept_offset + (num_states + 7) // 8)
+	end = alphabet_offset + INTERVAL.size * num_intervals
+	return table_offset, accept_offset, alphabet_offset, end
+
+
+# Serializa un DFA (o un CompiledDFA) y retorna los bytes del archivo.
+def dumps_dfa(dfa):
+	compiled = dfa if isinstance(dfa, CompiledDFA) else compile_dfa(dfa)
+	num_states, num_classes = compiled.num_states, compiled.num_classes
+	if num_states * num_classes >= 2 ** 31:
+		raise ValueError("El DFA es demasiado grande para el formato binario (tabla de más de 2^31 celdas).")
+	intervals = compiled.all_intervals()
+	table_offset, accept_offset, alphabet_offset, end = section_offsets(num_states, num_classes, len(intervals))
+
+	data = bytearray(end)
+	table = array('i', compiled.table)
+	if sys.byteorder != 'little':
+		table.byteswap()
+	data[table_offset:table_offset + len(table) * 4] = table.tobytes()
+	data[accept_offset:accept_offset + (num_states + 7) // 8] = compiled.accept_bits.to_bytes((num_states + 7) // 8, 'little')
+	for i, interval in enumerate(intervals):
+		INTERVAL.pack_into(data, alphabet_offset + i * INTERVAL.size, *interval)
+
+	checksum = zlib.crc32(memoryview(data)[HEADER.size:])
+	HEADER.pack_into(data, 0, MAGIC, VERSION, 0, num_states, num_classes, compiled.initial, len(intervals), checksum)
+	return bytes(data)
+
+
+# Reconstruye un CompiledDFA a partir de un buffer (bytes, bytearray o mmap).
+# La tabla queda como una vista sobre el buffer, que por lo tanto debe seguir abierto.
+# Lanza ValueError si el buffer no tiene el formato esperado o está dañado.
+def loads_dfa(buffer, verify=True):
+	view = memoryview(buffer)
+	if len(view) < HEADER.size:
+		raise ValueError("El archivo es demasiado corto para ser un DFA serializado.")
+	magic, version, _, num_states, num_classes, initial, num_intervals, checksum = HEADER.unpack_from(view, 0)
+	if magic != MAGIC:
+		raise ValueError("El archivo no es un DFA serializado (firma inválida).")
+	if version != VERSION:
+		raise ValueError(f"Versión de formato no soportada: {version} (se esperaba {VERSION}).")
+	table_offset, accept_offset, alphabet_offset, end = section_offsets(num_states, num_classes, num_intervals)
+	if len(view) != end:
+		raise ValueError(f"Tamaño de archivo inválido: {len(view)} bytes (se esperaban {end}).")
+	if verify and zlib.crc32(view[HEADER.size:]) != checksum:
+		raise ValueError("El DFA serializado está dañado (checksum inválido).")
+
+	table = view[table_offset:table_offset + 4 * num_states * num_classes].cast('i')
+	if sys.byteorder != 'little':
+		# La vista directa solo sirve con el orden de bytes del formato; en otro caso se copia
+		table = array('i', table)
+		table.byteswap()
+	accept_bits = int.from_bytes(view[accept_offset:accept_offset + (num_states + 7) // 8], 'little')
+	class_intervals = [INTERVAL.unpack_from(view, alphabet_offset + i * INTERVAL.size) for i in range(num_intervals)]
+
+	return CompiledDFA(range(num_states), {}, class_intervals, num_classes, table, initial, accept_bits)
+
+
+# Guarda un DFA en 'path'. El archivo se escribe primero con otro nombre y luego se reemplaza,
+# para que un proceso que lo esté cargando nunca vea un archivo a medio escribir.
+def save_dfa(dfa, path):
+	data = dumps_dfa(dfa)
+	temporary = f"{path}.tmp{os.getpid()}"
+	with open(temporary, 'wb') as file:
+		file.write(data)
+	os.replace(temporary, path)
+
+
+# Carga un DFA guardado con save_dfa. Con use_mmap=True la tabla se lee desde el archivo mapeado
+# en memoria: el sistema operativo comparte esas páginas entre todos los procesos que lo carguen.
+# La cabecera y el tamaño exacto del archivo se validan siempre. El checksum recorre el archivo
+# completo, así que por defecto solo se verifica sin mmap (cuando el archivo ya se leyó entero);
+# con mmap se pide con verify=True, a costa de cargar todas sus páginas.
+def load_dfa(path, use_mmap=True, verify=None):
+	if verify is None:
+		verify = not use_mmap
+	with open(path, 'rb') as file:
+		if use_mmap and os.fstat(file.fileno()).st_size > 0:
+			buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+		else:
+			buffer = file.read()
+	return loads_dfa(buffer, verify)
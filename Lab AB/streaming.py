@@ -0,0 +1,132 @@
+from array import array
+
+from char_class import CharClass
+
+from dfa import DFA
+from nfa import NFA, CompactNFA, NFASimulator
+from compiled_dfa import CompiledDFA, compile_dfa
+
+# Clase StreamingMatcher: evalúa una entrada que llega por partes (sockets, tuberías).
+# feed(fragmento) avanza el autómata, finish() indica si la entrada completa es aceptada.
+# El estado puede guardarse con snapshot() y recuperarse con restore(), incluso en otro proceso.
+# Cuando el autómata llega a un estado desde el que ya no se puede aceptar, feed() deja de
+# procesar y retorna False para que el llamador pueda cortar la lectura.
+class StreamingMatcher:
+	def __init__(self, automaton):
+		if isinstance(automaton, (DFA, CompiledDFA)):
+			self.mode = 'dfa'
+			self.compiled_dfa = automaton if isinstance(automaton, CompiledDFA) else compile_dfa(automaton)
+			self.live_rows = find_live_rows(self.compiled_dfa)
+		elif isinstance(automaton, (NFA, CompactNFA, NFASimulator)):
+			self.mode = 'nfa'
+			self.simulator = automaton if isinstance(automaton, NFASimulator) else NFASimulator(automaton)
+			self.marks = array('l', [-1]) * self.simulator.num_states
+			self.generation = 0
+		else:
+			raise TypeError(f"No se puede crear un StreamingMatcher a partir de {type(automaton).__name__}.")
+		self.reset()
+
+	# Regresa al estado inicial.
+	def reset(self):
+		if self.mode == 'dfa':
+			self.row = self.compiled_dfa.initial
+			self.alive = self.row in self.live_rows
+		else:
+			self.states = self.simulator.initial_states
+			self.alive = bool(self.states)
+		self.consumed = 0  # Cantidad de caracteres recibidos
+
+	# Avanza el autómata con un fragmento de la entrada. Retorna False si ya no es posible aceptar.
+	def feed(self, chunk):
+		if not self.alive:
+			return False
+		if self.mode == 'dfa':
+			self.feed_dfa(chunk)
+		else:
+			self.feed_nfa(chunk)
+		self.consumed += len(chunk)
+		return self.alive
+
+	def feed_dfa(self, chunk):
+		classes, table, live_rows = self.compiled_dfa.symbol_classes, self.compiled_dfa.table, self.live_rows
+		row = self.row
+		for symbol in chunk:
+			symbol_class = classes.get(symbol)
+			if symbol_class is None:
+				symbol_class = self.compiled_dfa.classify(symbol)
+			row = table[row + symbol_class] if symbol_class is not None else -1
+			if row not in live_rows:
+				self.alive = False
+				break
+		self.row = row
+
+	def feed_nfa(self, chunk):
+		label, targets, marks = self.simulator.label, self.simulator.targets, self.marks
+		current_states = self.states
+		generation = self.generation
+		for symbol in chunk:
+			generation += 1
+			next_states = []
+			for state in current_states:
+				state_label = label[state]
+				if state_label == symbol or (state_label.__class__ is CharClass and symbol in state_label):
+					for target in targets[state]:
+						if marks[target] != generation:
+							marks[target] = generation
+							next_states.append(target)
+			current_states = next_states
+			# En un NFA de Thompson todo estado alcanza la aceptación: sin estados no hay coincidencia
+			if not current_states:
+				self.alive = False
+				break
+		self.states = current_states
+		self.generation = generation
+
+	# Retorna True si la entrada recibida hasta ahora es aceptada.
+	def finish(self):
+		if not self.alive:
+			return False
+		if self.mode == 'dfa':
+			return self.compiled_dfa.is_accept(self.row // self.compiled_dfa.num_classes)
+		return self.simulator.accept in self.states
+
+	# Retorna una copia serializable (pickle/JSON) del estado actual del matcher.
+	def snapshot(self):
+		position = self.row if self.mode == 'dfa' else list(self.states)
+		return {'mode': self.mode, 'position': position, 'alive': self.alive, 'consumed': self.consumed}
+
+	# Restaura un estado obtenido con snapshot() de un matcher construido con el mismo autómata.
+	def restore(self, snapshot):
+		if snapshot['mode'] != self.mode:
+			raise ValueError("La instantánea no corresponde al tipo de autómata de este matcher.")
+		if self.mode == 'dfa':
+			self.row = snapshot['position']
+		else:
+			self.states = list(snapshot['position'])
+		self.alive = snapshot['alive']
+		self.consumed = snapshot['consumed']
+
+
+# Calcula las filas de la tabla compilada desde las que todavía se puede llegar a un estado de aceptación.
+def find_live_rows(compiled_dfa):
+	num_classes = compiled_dfa.num_classes
+	table = compiled_dfa.table
+
+	# Transiciones inversas entre estados numerados
+	predecessors = [[] for _ in range(compiled_dfa.num_states)]
+	for state in range(compiled_dfa.num_states):
+		for symbol_class in range(num_classes):
+			target = table[state * num_classes + symbol_class]
+			if target >= 0:
+				predecessors[target // num_classes].append(state)
+
+	live = {state for state in range(compiled_dfa.num_states) if compiled_dfa.is_accept(state)}
+	stack = list(live)
+	while stack:
+		state = stack.pop()
+		for previous in predecessors[state]:
+			if previous not in live:
+				live.add(previous)
+				stack.append(previous)
+
+	return {state * num_classes for state in live}
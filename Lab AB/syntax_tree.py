@@ -1,4 +1,4 @@
-from graphviz import Digraph
+from instrumentation import timed
 
 # Clase que define los nodos del arbol sintactico.
 # Cada nodo tiene un valor y una lista de hijos.
@@ -10,10 +10,131 @@ class Node:
 
 
 
+# Valor de un nodo de repetición acotada r{min,max}; max es None en r{min,}.
+# La subexpresión aparece una sola vez en el árbol y en el postfix, sin importar los conteos.
+class Repeat:
+	__slots__ = ('min', 'max')
+
+	def __init__(self, min, max):
+		self.min = min
+		self.max = max
+
+	def __eq__(self, other):
+		return isinstance(other, Repeat) and self.min == other.min and self.max == other.max
+
+	def __hash__(self):
+		return hash((Repeat, self.min, self.max))
+
+	def __str__(self):
+		if self.max is None:
+			return f"{{{self.min},}}"
+		if self.min == self.max:
+			return f"{{{self.min}}}"
+		return f"{{{self.min},{self.max}}}"
+
+	def __repr__(self):
+		return f"Repeat({self.min}, {self.max})"
+
+
+# Valor de un nodo de grupo de captura (...) con su número (desde 1, en el orden de los '(').
+# Solo aparece en los árboles analizados con captures=True; para el lenguaje reconocido es transparente.
+class Group:
+	__slots__ = ('index',)
+
+	def __init__(self, index):
+		self.index = index
+
+	def __eq__(self, other):
+		return isinstance(other, Group) and self.index == other.index
+
+	def __hash__(self):
+		return hash((Group, self.index))
+
+	def __str__(self):
+		return f"({self.index})"
+
+	def __repr__(self):
+		return f"Group({self.index})"
+
+
+# Copia un subárbol de forma iterativa.
+def copy_tree(root):
+	copies = {}
+	stack = [(root, False)]
+	while stack:
+		node, children_done = stack.pop()
+		if children_done:
+			copy = Node(node.value)
+			copy.children = [copies.pop(child) for child in node.children]
+			copies[node] = copy
+		else:
+			stack.append((node, True))
+			for child in reversed(node.children):
+				stack.append((child, False))
+	return copies[root]
+
+
+# Retorna un árbol equivalente en el que cada repetición r{m,n} se reescribe con '.', '?', '*' y '+'.
+# Las copias opcionales se anidan, r(r(r)?)?, para que la cantidad de relaciones entre ellas sea lineal.
+# Lo usan las construcciones que necesitan una posición distinta por cada aparición de un símbolo.
+# Los grupos de captura no afectan el lenguaje, así que se descartan.
+def expand_repeats(root):
+	expanded = {}
+	stack = [(root, False)]
+	while stack:
+		node, children_done = stack.pop()
+		if not children_done:
+			stack.append((node, True))
+			for child in reversed(node.children):
+				stack.append((child, False))
+			continue
+
+		children = [expanded.pop(child) for child in node.children]
+		if isinstance(node.value, Group):
+			new_node = children[0]
+		elif not isinstance(node.value, Repeat):
+			new_node = Node(node.value)
+			new_node.children = children
+		else:
+			new_node = expand_repeat(children[0], node.value)
+		expanded[node] = new_node
+	return expanded[root]
+
+def expand_repeat(child, repeat):
+	def unary(value, operand):
+		node = Node(value)
+		node.children.append(operand)
+		return node
+
+	def concat(left, right):
+		if left is None:
+			return right
+		node = Node('.')
+		node.children.extend((left, right))
+		return node
+
+	if repeat.max is None:
+		required = max(repeat.min - 1, 0)
+		tail = unary('+' if repeat.min > 0 else '*', copy_tree(child))
+	else:
+		required = repeat.min
+		tail = None
+		for _ in range(repeat.max - repeat.min):
+			tail = unary('?', concat(copy_tree(child), tail) if tail is not None else copy_tree(child))
+
+	node = None
+	for _ in range(required):
+		node = concat(node, copy_tree(child))
+	if tail is not None:
+		node = concat(node, tail)
+	return node if node is not None else Node('ε')
+
+
 # Clase que modela y construye un arbol sintactico a partir de una expresion dada en formato postfix
 class SyntaxTree(object):
 
 	# Procesa la expresion caracter por caracter, utilizando una pila para realizar un seguimiento de los nodos
+	@timed('build_tree')
 	def build_tree(self, postfix):
 		
 		stack = [] # Pila para mantener un registro de los nodos mientras se construye el arbol
@@ -22,12 +143,12 @@ class SyntaxTree(object):
 		for char in postfix:
 
 			# Si el caracter es un operando, crea un nuevo nodo y lo agrega a la pila
-			if char not in '*|.':
+			if char not in ('*', '+', '?', '|', '.') and not isinstance(char, (Repeat, Group)):
 				new_node = Node(char)
 				stack.append(new_node)
 			
-			# Si el caracter es '*', crea un nuevo nodo y lo asigna como hijo del nodo anterior
-			elif char == '*':
+			# Si el caracter es '*', '+', '?', una repetición {m,n} o un grupo de captura, crea un nuevo nodo y lo asigna como hijo del nodo anterior
+			elif char in ('*', '+', '?') or isinstance(char, (Repeat, Group)):
 				if len(stack) >= 1:
 					child = stack.pop()
 					new_node = Node(char)
@@ -37,7 +158,7 @@ class SyntaxTree(object):
 					raise Exception("Expresion no valida")
 
 			# Si el caracter es '|' o '.', crea un nuevo nodo y asigna los dos nodos anteriores como hijos
-			elif char in "|.":
+			elif char in ('|', '.'):
 				if len(stack) >= 2:
 					new_node = Node(char)
 					right_child = stack.pop()
@@ -52,21 +173,7 @@ class SyntaxTree(object):
 		return stack[0] if len(stack) == 1 else None
 
 
-	# Visualiza el arbol sintactico utilizando la libreria Graphviz.
+	# Visualiza el arbol sintactico utilizando la libreria Graphviz (ver visualization.py).
 	def visualize_tree(self, root, dot=None):
-
-		# Inicializa el objeto Digraph si no se proporciona
-		if dot is None:
-			dot = Digraph()
-
-		# Si el nodo raiz existe, procede a visualizar
-		if root:
-			 # Crea un nodo en el grafico para la raiz
-			dot.node(str(id(root)), str(root.value))
-
-			# Recorre cada hijo de la raiz y crea nodos y aristas en el grafico
-			for child in root.children:
-				dot.node(str(id(child)), str(child.value))
-				dot.edge(str(id(root)), str(id(child)))
-				self.visualize_tree(child, dot) # Llamada recursiva para visualizar subarboles
-		return dot
+		from visualization import tree_graph
+		return tree_graph(root, dot)
@@ -0,0 +1,189 @@
+import json
+from collections import deque
+
+from nfa import CompactNFA, to_compact
+from compiled_dfa import CompiledDFA
+
+# Visualización de árboles y autómatas.
+#
+# Graphviz se importa solo cuando se construye un gráfico, así que el resto del proyecto (y los
+# procesos que solo emparejan) no dependen de él. Todos los recorridos son iterativos.
+#
+# Para autómatas grandes, export_dfa y export_nfa escriben DOT o JSON directamente a un archivo,
+# estado por estado, sin construir el gráfico en memoria; a partir de 'max_states' estados se
+# detienen y agregan un resumen con la cantidad de estados omitidos.
+
+# Cantidad de estados por defecto a partir de la cual se resume la exportación
+DEFAULT_MAX_STATES = 10000
+
+
+def load_digraph():
+	try:
+		from graphviz import Digraph
+	except ImportError:
+		raise ImportError("La visualización requiere el paquete graphviz (pip install graphviz).") from None
+	return Digraph
+
+
+# Construye el gráfico del árbol sintáctico.
+def tree_graph(root, dot=None):
+	if dot is None:
+		dot = load_digraph()()
+	if root is None:
+		return dot
+
+	dot.node(str(id(root)), str(root.value))
+	stack = [root]
+	while stack:
+		node = stack.pop()
+		for child in node.children:
+			dot.node(str(id(child)), str(child.value))
+			dot.edge(str(id(node)), str(id(child)))
+			stack.append(child)
+	return dot
+
+
+# Recorre un CompactNFA en anchura desde su estado inicial. Genera (número, nombre, es_aceptación, aristas)
+# por estado, donde los números siguen el orden del recorrido y aristas es una lista de (etiqueta, número destino).
+def iterate_nfa(compact):
+	label, edge1, edge2 = compact.label, compact.edge1, compact.edge2
+	numbers = {compact.initial: 0}
+	queue = deque([compact.initial])
+	while queue:
+		state = queue.popleft()
+		edges = []
+		if edge1[state] >= 0:
+			edges.append((str(label[state]) if label[state] is not None else 'ε', edge1[state]))
+		if edge2[state] >= 0:
+			edges.append(('ε', edge2[state]))
+		for _, target in edges:
+			if target not in numbers:
+				numbers[target] = len(numbers)
+				queue.append(target)
+		number = numbers[state]
+		yield number, str(number), state == compact.accept, [(edge_label, numbers[target]) for edge_label, target in edges]
+
+
+# Recorre un DFA (o CompiledDFA) en anchura desde su estado inicial, con la misma forma que iterate_nfa.
+def iterate_dfa(dfa):
+	if isinstance(dfa, CompiledDFA):
+		yield from iterate_compiled_dfa(dfa)
+		return
+	if dfa.initial_state is None:
+		return
+	accept_states = set(dfa.accept_states)
+	numbers = {dfa.initial_state: 0}
+	queue = deque([dfa.initial_state])
+	while queue:
+		state = queue.popleft()
+		edges = []
+		for symbol, target in dfa.transitions.get(state, {}).items():
+			if target not in numbers:
+				numbers[target] = len(numbers)
+				queue.append(target)
+			edges.append((str(symbol), numbers[target]))
+		yield numbers[state], str(state), state in accept_states, edges
+
+def iterate_compiled_dfa(compiled):
+	if compiled.initial < 0:
+		return
+	num_classes = compiled.num_classes
+	# Símbolos de cada clase, para etiquetar las aristas
+	class_labels = [[] for _ in range(num_classes)]
+	for start, end, symbol_class in compiled.all_intervals():
+		class_labels[symbol_class].append(chr(start) if start == end else f"{chr(start)}-{chr(end)}")
+	class_labels = [','.join(labels) for labels in class_labels]
+
+	numbers = {0: 0}
+	queue = deque([0])
+	while queue:
+		state = queue.popleft()
+		by_target = {}
+		for symbol_class in range(num_classes):
+			row = compiled.table[state * num_classes + symbol_class]
+			if row >= 0:
+				by_target.setdefault(row // num_classes, []).append(class_labels[symbol_class])
+		edges = []
+		for target, labels in by_target.items():
+			if target not in numbers:
+				numbers[target] = len(numbers)
+				queue.append(target)
+			edges.append((','.join(labels), numbers[target]))
+		yield numbers[state], str(state), compiled.is_accept(state), edges
+
+
+# Construye un gráfico de Graphviz a partir de uno de los recorridos anteriores.
+def automaton_graph(states):
+	dot = load_digraph()()
+	dot.attr('node', shape='circle')
+	dot.node('start', shape='none', label='')
+	dot.edge('start', '0')
+	for number, name, is_accept, edges in states:
+		dot.node(str(number), name, shape='doublecircle' if is_accept else 'circle')
+		for edge_label, target in edges:
+			dot.edge(str(number), str(target), label=edge_label)
+	return dot
+
+
+def nfa_graph(nfa):
+	return automaton_graph(iterate_nfa(nfa if isinstance(nfa, CompactNFA) else to_compact(nfa)))
+
+def dfa_graph(dfa):
+	return automaton_graph(iterate_dfa(dfa))
+
+
+# Renderiza el gráfico en PDF. 'directory' indica dónde guardarlo y 'view' si se abre el visor.
+def render(dot, name, directory=None, view=True):
+	return dot.render(name, directory=directory, view=view, cleanup=True)
+
+
+# Escapa un texto como identificador o etiqueta DOT entre comillas.
+def dot_quote(text):
+	return '"' + text.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+
+
+# Escribe el autómata en formato DOT o JSON directamente en 'path', sin construirlo en memoria.
+# 'total' es la cantidad de estados del autómata, usada en el resumen. Retorna los estados escritos.
+def export_automaton(states, total, path, format='dot', max_states=DEFAULT_MAX_STATES):
+	if format not in ('dot', 'json'):
+		raise ValueError(f"Formato de exportación desconocido: {format!r}.")
+
+	written = 0
+	truncated = False
+	with open(path, 'w', encoding='utf-8') as file:
+		if format == 'dot':
+			file.write('digraph {\n\tnode [shape=circle]\n\tstart [label="" shape=none]\n\tstart -> 0\n')
+		else:
+			file.write('{"states": [')
+
+		for number, name, is_accept, edges in states:
+			if written >= max_states:
+				truncated = True
+				break
+			if format == 'dot':
+				file.write(f"\t{number} [label={dot_quote(name)} shape={'doublecircle' if is_accept else 'circle'}]\n")
+				for edge_label, target in edges:
+					if target < max_states:
+						file.write(f"\t{number} -> {target} [label={dot_quote(edge_label)}]\n")
+			else:
+				state = {'id': number, 'name': name, 'accept': is_accept, 'edges': [{'label': edge_label, 'to': target} for edge_label, target in edges]}
+				file.write((', ' if written else '') + json.dumps(state, ensure_ascii=False))
+			written += 1
+
+		# Resumen de los estados omitidos
+		if format == 'dot':
+			if truncated:
+				file.write(f'\ttruncated [label="... {total - written} estados omitidos de {total}" shape=box]\n')
+			file.write('}\n')
+		else:
+			file.write(f'], "total_states": {total}, "truncated": {json.dumps(truncated)}}}\n')
+	return written
+
+
+def export_nfa(nfa, path, format='dot', max_states=DEFAULT_MAX_STATES):
+	compact = nfa if isinstance(nfa, CompactNFA) else to_compact(nfa)
+	return export_automaton(iterate_nfa(compact), len(compact), path, format, max_states)
+
+def export_dfa(dfa, path, format='dot', max_states=DEFAULT_MAX_STATES):
+	total = dfa.num_states if isinstance(dfa, CompiledDFA) else len(dfa.states)
+	return export_automaton(iterate_dfa(dfa), total, path, format, max_states)